@@ -2,23 +2,114 @@
 上下文管理 Agent
 基于 Strands SDK 构建，集成知识库管理和对话跟踪功能
 """
+import copy
+import os
 import json
+import logging
+import time
 import uuid
-from typing import Dict, List, Optional, Any, Tuple
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Any, Tuple
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields, is_dataclass
+from enum import Enum
+from functools import lru_cache
 
-from config import get_logger
+from config import get_logger, is_log_enabled, system_config
 from models.subtitle_models import SubtitleEntry
-from models.story_models import StoryContext, CharacterRelation
+from models.story_models import StoryContext, CharacterRelation, RelationshipConfig
+from models.dataclass_options import SLOTS_DATACLASS_OPTIONS
 from agents.context_manager import get_context_manager
 from agents.dynamic_knowledge_manager import get_dynamic_knowledge_manager, KnowledgeQuery
 from agents.dialogue_context_tracker import get_dialogue_tracker, DialogueEntry
 
 logger = get_logger("context_agent")
 
+# 查询结果缓存容量
+QUERY_CACHE_SIZE = 2048
 
-@dataclass
+# 持久化查询结果缓存的有效期（秒）
+DISK_CACHE_TTL_SECONDS = 86400
+
+# 代词对应的角色性别
+PRONOUN_GENDERS = {"他": "male", "她": "female"}
+
+# 必须携带字幕条目的查询类型
+SUBTITLE_REQUIRED_QUERY_TYPES = frozenset({"speaker_inference", "pronoun_resolution", "dialogue_analysis"})
+
+# 可复用调用方已加载的故事上下文的查询类型
+STORY_CONTEXT_QUERY_TYPES = frozenset({"pronoun_resolution", "relationship_analysis"})
+
+# 文化适配建议: (文化标注, 目标语言) -> 建议，目标语言为空表示适用于所有语言
+CULTURAL_RECOMMENDATIONS: Dict[Tuple[str, str], Tuple[str, ...]] = {
+    ("军事题材", "en"): ("注意军事术语的准确翻译", "保持军事等级制度的体现"),
+    ("军事题材", "ja"): ("考虑日本的敬语体系",),
+    ("现代背景", ""): ("使用现代语言表达", "避免过于正式的古典表达"),
+}
+
+# 文化标注的建议输出顺序
+CULTURAL_NOTE_ORDER = ("军事题材", "现代背景")
+
+# 正式程度建议
+FORMALITY_SUGGESTIONS: Dict[str, Tuple[str, ...]] = {
+    "very_high": ("使用非常正式的语言", "避免口语化表达"),
+    "high": ("使用正式语言", "保持礼貌用词"),
+    "low": ("可以使用较为随意的表达", "允许口语化用词"),
+}
+
+# 尊敬程度建议
+RESPECT_SUGGESTIONS: Dict[str, Tuple[str, ...]] = {
+    "high": ("体现尊敬态度",),
+    "caring": ("体现关爱情感",),
+}
+
+# 称谓风格建议
+ADDRESS_STYLE_RECOMMENDATIONS: Dict[str, Tuple[str, ...]] = {
+    "formal_title": ("使用正式职务称谓",),
+    "brotherhood": ("使用战友称谓",),
+    "intimate": ("使用亲密称谓",),
+    "family": ("使用家庭称谓",),
+}
+
+
+@lru_cache(maxsize=None)
+def _dataclass_fields(cls: type) -> Tuple[str, ...]:
+    """dataclass 字段名（按类缓存）"""
+    return tuple(f.name for f in fields(cls))
+
+
+def _plain_value(value: Any) -> Any:
+    """将字段值转换为可 JSON 序列化的值"""
+    if isinstance(value, Enum):
+        return value.value
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if is_dataclass(value) and not isinstance(value, type):
+        return to_plain_dict(value)
+    if isinstance(value, dict):
+        return {key: _plain_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return [_plain_value(item) for item in value]
+    return value
+
+
+def to_plain_dict(obj: Any) -> Dict[str, Any]:
+    """将 dataclass 实例转换为可 JSON 序列化的字典
+    
+    列表、集合和字典复制为新的列表和字典（集合转为列表），枚举取值，时间转为
+    ISO 字符串，嵌套的 dataclass 递归转换；与 asdict 不同，不对叶子值做 deepcopy。
+    结果不与对话跟踪器、故事上下文等内部状态共享可变对象
+    """
+    return {name: _plain_value(getattr(obj, name)) for name in _dataclass_fields(type(obj))}
+
+
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ContextQuery:
     """上下文查询请求"""
     query_id: str
@@ -35,7 +126,7 @@ class ContextQuery:
             self.timestamp = datetime.now()
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ContextResponse:
     """上下文查询响应"""
     query_id: str
@@ -51,6 +142,93 @@ class ContextResponse:
             self.timestamp = datetime.now()
 
 
+class _DiskResultCache:
+    """基于 sqlite3 的持久化查询结果缓存，进程重启后仍可复用
+    
+    首次读写时才打开数据库；结果以 JSON 存储，只缓存能按原样还原的结果。
+    缓存读写失败只记录日志，不影响查询本身
+    """
+    
+    def __init__(self, db_path: str, ttl_seconds: float = DISK_CACHE_TTL_SECONDS):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = False
+    
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """获取数据库连接（调用方需持有锁），打开失败后不再重试"""
+        if self._conn is None and not self._disabled:
+            try:
+                os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                with conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS json_query_results "
+                        "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                    )
+                self._conn = conn
+            except Exception as e:
+                self._disabled = True
+                logger.warning("持久化缓存不可用，仅使用内存缓存", db_path=self.db_path, error=str(e))
+        return self._conn
+    
+    @staticmethod
+    def make_key(prefix: str, *parts: Any) -> str:
+        """生成跨进程稳定的缓存键（内置 hash 在进程间随机化，不能使用）"""
+        digest = hashlib.sha1(
+            json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        return f"{prefix}:{digest}"
+    
+    def get(self, key: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """读取未过期的 (结果, 置信度)"""
+        try:
+            with self._lock:
+                conn = self._connection()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT value, expires_at FROM json_query_results WHERE key = ?", (key,)
+                ).fetchone()
+            if row is None or row[1] < time.time():
+                return None
+            payload = json.loads(row[0])
+            return payload["result"], payload["confidence"]
+        except Exception as e:
+            logger.warning("读取持久化缓存失败", key=key, error=str(e))
+            return None
+    
+    def set(self, key: str, result: Dict[str, Any], confidence: float):
+        """写入 (结果, 置信度)；JSON 无法原样还原的结果（元组、非字符串键、自定义对象等）不缓存"""
+        try:
+            payload = json.dumps({"result": result, "confidence": confidence}, ensure_ascii=False)
+            if json.loads(payload)["result"] != result:
+                return
+        except (TypeError, ValueError):
+            return
+        
+        try:
+            with self._lock:
+                conn = self._connection()
+                if conn is None:
+                    return
+                with conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO json_query_results (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, payload, time.time() + self.ttl_seconds)
+                    )
+        except Exception as e:
+            logger.warning("写入持久化缓存失败", key=key, error=str(e))
+    
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
 class ContextAgent:
     """上下文管理 Agent
     
@@ -71,14 +249,40 @@ class ContextAgent:
         
         # Agent 状态
         self.active_sessions: Dict[str, str] = {}  # session_id -> project_id
-        self.query_history: List[ContextQuery] = []
+        self._project_to_session: Dict[str, str] = {}  # project_id -> 该项目最早的活跃 session_id
+        self.query_history: Deque[ContextQuery] = deque(maxlen=1000)  # 保持历史记录在合理范围内
         self.performance_metrics: Dict[str, Any] = {
             "total_queries": 0,
             "successful_queries": 0,
             "average_response_time": 0.0,
+            "cache_hits": 0,
+            "cache_misses": 0,
             "query_types": {}
         }
         
+        # 项目角色索引: project_id -> {角色名: (角色, 性别)}，清除项目缓存时失效
+        self._character_cache: Dict[str, Dict[str, Tuple[CharacterRelation, Optional[str]]]] = {}
+        
+        # 人物关系缓存: project_id -> {(说话人, 受话人): 关系}，清除项目缓存时失效
+        self._relationship_cache: Dict[str, Dict[Tuple[str, str], Optional[RelationshipConfig]]] = {}
+        
+        # 每个会话最后写入对话跟踪器的字幕: session_id -> (序号, 文本)
+        self._last_indexed: Dict[str, Tuple[int, str]] = {}
+        
+        # 文化适配和知识库查询的持久化缓存（首次使用时才打开数据库）
+        self._disk_cache = _DiskResultCache(
+            os.path.join(system_config.cache_dir, "context_agent", "query_results.sqlite3")
+        )
+        
+        # 查询结果缓存 (LRU)
+        self._query_cache: "OrderedDict[Tuple, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        
+        # 并发执行相互独立的统计查询
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix=self.agent_id)
+        
+        # 项目上下文被清除时同步失效派生缓存
+        self.context_manager.add_clear_callback(self._on_project_cache_cleared)
+        
         # 查询处理器映射
         self.query_processors = {
             "speaker_inference": self._process_speaker_inference,
@@ -96,6 +300,7 @@ class ContextAgent:
         """开始新的上下文会话"""
         session_id = str(uuid.uuid4())
         self.active_sessions[session_id] = project_id
+        self._project_to_session.setdefault(project_id, session_id)
         
         # 初始化对话跟踪（DialogueHistory 不需要显式会话管理）
         # self.context_tracker 已经在初始化时创建
@@ -120,18 +325,33 @@ class ContextAgent:
             
             # 清理会话
             del self.active_sessions[session_id]
+            self._last_indexed.pop(session_id, None)
+            
+            # 更新反向索引，同一项目仍有其他会话时指向下一个会话
+            if self._project_to_session.get(project_id) == session_id:
+                del self._project_to_session[project_id]
+                for other_session_id, other_project_id in self.active_sessions.items():
+                    if other_project_id == project_id:
+                        self._project_to_session[project_id] = other_session_id
+                        break
             
             logger.info("上下文会话已结束", session_id=session_id, project_id=project_id)
         else:
             logger.warning("会话不存在", session_id=session_id)
     
-    def process_query(self, query: ContextQuery) -> ContextResponse:
-        """处理上下文查询"""
-        start_time = datetime.now()
+    def process_query(self, query: ContextQuery,
+                      story_context: Optional[StoryContext] = None) -> ContextResponse:
+        """处理上下文查询
+        
+        story_context 由批量处理传入，已加载时跳过处理器内部的重复加载
+        """
+        start_ns = time.perf_counter_ns()
         
         try:
             # 验证查询
-            if not self._validate_query(query):
+            query_type = query.query_type
+            if (not query.project_id or not query_type or
+                    (query_type in SUBTITLE_REQUIRED_QUERY_TYPES and not query.subtitle_entry)):
                 return ContextResponse(
                     query_id=query.query_id,
                     success=False,
@@ -139,7 +359,7 @@ class ContextAgent:
                 )
             
             # 获取查询处理器
-            processor = self.query_processors.get(query.query_type)
+            processor = self.query_processors.get(query_type)
             if not processor:
                 return ContextResponse(
                     query_id=query.query_id,
@@ -147,19 +367,33 @@ class ContextAgent:
                     error_message=f"不支持的查询类型: {query.query_type}"
                 )
             
-            # 处理查询
-            result, confidence = processor(query)
+            # 处理查询，相同查询直接复用缓存结果
+            cache_key = self._make_cache_key(query)
+            cached = self._query_cache.get(cache_key) if cache_key is not None else None
+            if cached is not None:
+                # 命中时直接返回缓存中的结果（写入时已复制），调用方不应修改
+                self._query_cache.move_to_end(cache_key)
+                self.performance_metrics["cache_hits"] += 1
+                result, confidence = cached
+            elif story_context is not None and query.query_type in STORY_CONTEXT_QUERY_TYPES:
+                result, confidence = processor(query, story_context=story_context)
+            else:
+                result, confidence = processor(query)
+            
+            if cached is None and cache_key is not None:
+                self.performance_metrics["cache_misses"] += 1
+                self._query_cache[cache_key] = (copy.deepcopy(result), confidence)
+                if len(self._query_cache) > QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
             
             # 计算处理时间
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            processing_time = (time.perf_counter_ns() - start_ns) / 1_000_000
             
             # 更新性能指标
             self._update_performance_metrics(query.query_type, processing_time, True)
             
             # 记录查询历史
             self.query_history.append(query)
-            if len(self.query_history) > 1000:  # 保持历史记录在合理范围内
-                self.query_history.pop(0)
             
             response = ContextResponse(
                 query_id=query.query_id,
@@ -169,20 +403,22 @@ class ContextAgent:
                 processing_time_ms=int(processing_time)
             )
             
-            logger.debug("上下文查询处理完成", 
-                        query_type=query.query_type,
-                        confidence=confidence,
-                        processing_time=processing_time)
+            if is_log_enabled("context_agent", logging.DEBUG):
+                logger.debug("上下文查询处理完成", 
+                            query_type=query.query_type,
+                            confidence=confidence,
+                            processing_time=processing_time)
             
             return response
             
         except Exception as e:
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            processing_time = (time.perf_counter_ns() - start_ns) / 1_000_000
             self._update_performance_metrics(query.query_type, processing_time, False)
             
-            logger.error("上下文查询处理失败", 
-                        query_type=query.query_type,
-                        error=str(e))
+            if is_log_enabled("context_agent", logging.ERROR):
+                logger.error("上下文查询处理失败", 
+                            query_type=query.query_type,
+                            error=str(e))
             
             return ContextResponse(
                 query_id=query.query_id,
@@ -191,20 +427,75 @@ class ContextAgent:
                 processing_time_ms=int(processing_time)
             )
     
-    def _validate_query(self, query: ContextQuery) -> bool:
-        """验证查询请求"""
-        if not query.project_id:
-            return False
+    def process_query_batch(self, queries: List[ContextQuery]) -> List[ContextResponse]:
+        """批量处理上下文查询
+        
+        按项目分组，每个项目只加载一次故事上下文并确保跟踪会话存在，
+        返回结果与输入顺序一致
+        """
+        groups: Dict[str, List[int]] = {}
+        for position, query in enumerate(queries):
+            groups.setdefault(query.project_id, []).append(position)
+        
+        responses: List[Optional[ContextResponse]] = [None] * len(queries)
+        for project_id, positions in groups.items():
+            story_context = None
+            if project_id:
+                try:
+                    story_context = self.context_manager.load_project_context(project_id)
+                    self._get_or_create_tracking_session(project_id)
+                except Exception as e:
+                    # 加载失败时逐条处理，由 process_query 返回错误响应
+                    logger.error("批量查询预加载项目上下文失败", project_id=project_id, error=str(e))
+                    story_context = None
+            
+            for position in positions:
+                responses[position] = self.process_query(queries[position], story_context)
         
-        if not query.query_type:
-            return False
+        return responses
+    
+    def _make_cache_key(self, query: ContextQuery) -> Optional[Tuple]:
+        """生成查询缓存键，只包含对应处理器实际读取的字段；不可缓存的查询返回 None
+        
+        键的第一项为项目ID，清除项目缓存时据此失效
+        """
+        if query.query_type == "cultural_adaptation":
+            # 文化适配只读取字幕文本和目标语言，与序号、说话人和对话历史无关
+            entry = query.subtitle_entry
+            return (
+                query.project_id,
+                query.query_type,
+                entry.text if entry else "",
+                query.target_language or "en"
+            )
         
-        # 特定查询类型的验证
-        if query.query_type in ["speaker_inference", "pronoun_resolution", "dialogue_analysis"]:
-            if not query.subtitle_entry:
-                return False
+        if query.query_type == "knowledge_query":
+            params = query.additional_params or {}
+            # 附带上下文的知识查询结果随上下文变化，不缓存
+            if params.get("context"):
+                return None
+            return (
+                query.project_id,
+                query.query_type,
+                params.get("knowledge_type", "terminology"),
+                params.get("source_text", ""),
+                params.get("target_language", "en")
+            )
         
-        return True
+        # 其他查询依赖会话状态或可变的项目上下文，结果不可复用
+        return None
+    
+    def clear_query_cache(self):
+        """清空查询结果缓存"""
+        self._query_cache.clear()
+        logger.info("查询结果缓存已清空")
+    
+    def _on_project_cache_cleared(self, project_id: str):
+        """上下文管理器清除项目缓存时，丢弃该项目的查询结果缓存、角色索引和人物关系"""
+        self._character_cache.pop(project_id, None)
+        self._relationship_cache.pop(project_id, None)
+        for cache_key in [key for key in self._query_cache if key[0] == project_id]:
+            del self._query_cache[cache_key]
     
     def _process_speaker_inference(self, query: ContextQuery) -> Tuple[Dict[str, Any], float]:
         """处理说话人推断查询"""
@@ -232,7 +523,8 @@ class ContextAgent:
         
         return result, confidence
     
-    def _process_pronoun_resolution(self, query: ContextQuery) -> Tuple[Dict[str, Any], float]:
+    def _process_pronoun_resolution(self, query: ContextQuery,
+                                    story_context: Optional[StoryContext] = None) -> Tuple[Dict[str, Any], float]:
         """处理代词指代解析查询"""
         entry = query.subtitle_entry
         history = query.dialogue_history or []
@@ -243,15 +535,17 @@ class ContextAgent:
         # 添加对话条目到历史
         dialogue_entry = self.context_tracker.add_dialogue_entry(entry)
         
-        # 获取故事上下文
-        story_context = self.context_manager.load_project_context(query.project_id)
+        # 获取故事上下文及角色索引
+        if story_context is None:
+            story_context = self.context_manager.load_project_context(query.project_id)
+        character_index = self._get_character_index(query.project_id, story_context)
         
         # 解析代词
         resolved_pronouns = []
         for pronoun_ref in dialogue_entry.pronouns:
             # 这里需要实现具体的代词解析逻辑
             resolved_ref = self._resolve_single_pronoun(
-                pronoun_ref, entry, history, story_context
+                pronoun_ref, entry, history, character_index
             )
             resolved_pronouns.append({
                 "pronoun": pronoun_ref.pronoun,
@@ -264,7 +558,7 @@ class ContextAgent:
         
         result = {
             "resolved_pronouns": resolved_pronouns,
-            "dialogue_entry": asdict(dialogue_entry),
+            "dialogue_entry": to_plain_dict(dialogue_entry),
             "original_text": entry.text
         }
         
@@ -273,16 +567,25 @@ class ContextAgent:
     def _process_cultural_adaptation(self, query: ContextQuery) -> Tuple[Dict[str, Any], float]:
         """处理文化适配查询"""
         target_language = query.target_language or "en"
+        source_text = query.subtitle_entry.text if query.subtitle_entry else ""
         
         # 获取文化适配上下文
         adaptation_context = self.context_manager.get_cultural_adaptation_context(
             query.project_id, target_language
         )
         
+        # 结果包含项目的文化适配上下文，缓存键随之变化，项目上下文更新后不会读到旧结果
+        disk_key = _DiskResultCache.make_key(
+            "cult", query.project_id, target_language, source_text, adaptation_context
+        )
+        cached = self._disk_cache.get(disk_key)
+        if cached is not None:
+            return cached
+        
         # 查询文化知识库
         cultural_query = KnowledgeQuery(
             query_type="cultural",
-            source_text=query.subtitle_entry.text if query.subtitle_entry else "",
+            source_text=source_text,
             target_language=target_language,
             project_id=query.project_id
         )
@@ -300,9 +603,13 @@ class ContextAgent:
         
         confidence = kb_result.confidence if kb_result.success else 0.5
         
+        if kb_result.success:
+            self._disk_cache.set(disk_key, result, confidence)
+        
         return result, confidence
     
-    def _process_relationship_analysis(self, query: ContextQuery) -> Tuple[Dict[str, Any], float]:
+    def _process_relationship_analysis(self, query: ContextQuery,
+                                       story_context: Optional[StoryContext] = None) -> Tuple[Dict[str, Any], float]:
         """处理人物关系分析查询"""
         entry = query.subtitle_entry
         
@@ -316,20 +623,23 @@ class ContextAgent:
         relationship_info = context.get("relationship", {})
         
         # 获取详细的关系信息
-        story_context = self.context_manager.load_project_context(query.project_id)
+        if story_context is None:
+            story_context = self.context_manager.load_project_context(query.project_id)
         detailed_relationship = None
         
         if speaker and addressee:
-            detailed_relationship = story_context.get_relationship_between(speaker, addressee)
+            detailed_relationship = self._get_relationship(
+                query.project_id, story_context, speaker, addressee
+            )
         
         result = {
             "speaker": speaker,
             "addressee": addressee,
             "relationship_summary": relationship_info,
-            "detailed_relationship": asdict(detailed_relationship) if detailed_relationship else None,
+            "detailed_relationship": to_plain_dict(detailed_relationship) if detailed_relationship else None,
             "formality_suggestions": self._generate_formality_suggestions(relationship_info),
             "address_style_recommendations": self._generate_address_recommendations(
-                speaker, addressee, story_context
+                detailed_relationship
             )
         }
         
@@ -339,14 +649,16 @@ class ContextAgent:
     
     def _process_context_summary(self, query: ContextQuery) -> Tuple[Dict[str, Any], float]:
         """处理上下文摘要查询"""
-        # 获取项目统计信息
-        stats = self.context_manager.get_context_statistics(query.project_id)
-        
-        # 获取对话跟踪统计
-        tracking_stats = self.context_tracker.get_context_statistics()
+        # 项目统计、对话跟踪统计和知识库统计相互独立，并发获取
+        stats_future = self._executor.submit(
+            self.context_manager.get_context_statistics, query.project_id
+        )
+        tracking_future = self._executor.submit(self.context_tracker.get_context_statistics)
+        kb_future = self._executor.submit(self.dynamic_kb.get_statistics)
         
-        # 获取知识库统计
-        kb_stats = self.dynamic_kb.get_statistics()
+        stats = stats_future.result()
+        tracking_stats = tracking_future.result()
+        kb_stats = kb_future.result()
         
         result = {
             "project_context": stats,
@@ -365,13 +677,23 @@ class ContextAgent:
         # 启动或获取对话跟踪会话
         session_id = self._get_or_create_tracking_session(query.project_id)
         
-        # 分析对话模式
+        # 分析对话模式：只跟踪上次查询之后新增的历史条目。
+        # 以 (序号, 文本) 定位上次写入的字幕；当前序号不大于上次时视为新的字幕序列，重新写入全部历史
         if history:
-            for hist_entry in history:
+            start = 0
+            last_marker = self._last_indexed.get(session_id)
+            if last_marker is not None and entry.index > last_marker[0]:
+                for position, hist_entry in enumerate(history):
+                    if (hist_entry.index, hist_entry.text) == last_marker:
+                        start = position + 1
+                        break
+            
+            for hist_entry in history[start:]:
                 self.context_tracker.add_dialogue_entry(hist_entry)
         
-        # 跟踪当前条目
+        # 跟踪当前条目，并记为本会话最后写入的字幕
         current_context = self.context_tracker.add_dialogue_entry(entry)
+        self._last_indexed[session_id] = (entry.index, entry.text)
         
         # 获取会话分析（简化版本）
         session_patterns = {
@@ -383,7 +705,7 @@ class ContextAgent:
         context_changes = []
         
         result = {
-            "current_context": asdict(current_context),
+            "current_context": to_plain_dict(current_context),
             "session_patterns": session_patterns,
             "context_changes": context_changes,
             "dialogue_flow_analysis": self._analyze_dialogue_flow(history + [entry])
@@ -404,6 +726,14 @@ class ContextAgent:
             context=params.get("context", {})
         )
         
+        disk_key = _DiskResultCache.make_key(
+            "kb", query.project_id, kb_query.query_type, kb_query.target_language,
+            kb_query.source_text, kb_query.context
+        )
+        cached = self._disk_cache.get(disk_key)
+        if cached is not None:
+            return cached
+        
         # 执行查询
         kb_result = self.dynamic_kb.query_knowledge(kb_query)
         
@@ -414,14 +744,18 @@ class ContextAgent:
             "cache_hit": kb_result.cache_hit
         }
         
-        return result, kb_result.confidence if kb_result.success else 0.0
+        confidence = kb_result.confidence if kb_result.success else 0.0
+        
+        if kb_result.success:
+            self._disk_cache.set(disk_key, result, confidence)
+        
+        return result, confidence
     
     def _get_or_create_tracking_session(self, project_id: str) -> str:
         """获取或创建对话跟踪会话"""
-        # 查找现有会话
-        for session_id, proj_id in self.active_sessions.items():
-            if proj_id == project_id:
-                return session_id
+        session_id = self._project_to_session.get(project_id)
+        if session_id is not None:
+            return session_id
         
         # 创建新会话
         return self.start_session(project_id)
@@ -433,23 +767,16 @@ class ContextAgent:
         if not inferred_speaker:
             return 0.0
         
-        confidence = 0.5  # 基础置信度
-        
-        # 基于说话人信息的置信度调整
-        speaker_info = context.get("speaker_info", {})
-        if speaker_info:
-            confidence += 0.2
-        
-        # 基于关系信息的置信度调整
-        if context.get("relationship"):
-            confidence += 0.2
-        
-        # 基于对话历史的置信度调整
-        dialogue_history = context.get("dialogue_history", {})
-        if dialogue_history.get("recent_speakers"):
-            confidence += 0.1
+        # 基础置信度 + 说话人信息 / 关系信息 / 对话历史各自的加分
+        context_get = context.get
+        confidence = (
+            0.5
+            + 0.2 * bool(context_get("speaker_info"))
+            + 0.2 * bool(context_get("relationship"))
+            + 0.1 * bool(context_get("dialogue_history", {}).get("recent_speakers"))
+        )
         
-        return min(confidence, 1.0)
+        return confidence if confidence < 1.0 else 1.0
     
     def _generate_speaker_reasoning(self, entry: SubtitleEntry, 
                                   inferred_speaker: Optional[str], 
@@ -475,27 +802,46 @@ class ContextAgent:
         
         return " | ".join(reasoning_parts) if reasoning_parts else "基于文本分析"
     
+    def _get_character_index(self, project_id: str,
+                             story_context: StoryContext) -> Dict[str, Tuple[CharacterRelation, Optional[str]]]:
+        """获取项目角色索引，清除项目缓存后重建"""
+        character_index = self._character_cache.get(project_id)
+        if character_index is None:
+            character_index = {
+                name: (character, getattr(character, 'gender', None))
+                for name, character in story_context.main_characters.items()
+            }
+            self._character_cache[project_id] = character_index
+        return character_index
+    
+    def _get_relationship(self, project_id: str, story_context: StoryContext,
+                          speaker: str, addressee: str) -> Optional[RelationshipConfig]:
+        """获取两个角色间的关系，按项目缓存，清除项目缓存后失效"""
+        relationships = self._relationship_cache.setdefault(project_id, {})
+        key = (speaker, addressee)
+        if key not in relationships:
+            relationships[key] = story_context.get_relationship_between(speaker, addressee)
+        return relationships[key]
+    
     def _resolve_single_pronoun(self, pronoun_ref: Any, 
                                entry: SubtitleEntry, 
                                history: List[SubtitleEntry],
-                               story_context: StoryContext) -> Optional[Dict[str, Any]]:
+                               character_index: Dict[str, Tuple[CharacterRelation, Optional[str]]]) -> Optional[Dict[str, Any]]:
         """解析单个代词"""
         pronoun = pronoun_ref.pronoun if hasattr(pronoun_ref, 'pronoun') else ""
         
         # 简化的代词解析逻辑
-        if pronoun in ["他", "她", "它"]:
+        target_gender = PRONOUN_GENDERS.get(pronoun)
+        if target_gender:
             # 查找最近提及的相应性别的角色
             for hist_entry in reversed(history[-3:]):  # 检查最近3条
-                if hist_entry.speaker:
-                    character = story_context.get_character(hist_entry.speaker)
-                    if character and hasattr(character, 'gender'):
-                        if (pronoun == "他" and character.gender == "male") or \
-                           (pronoun == "她" and character.gender == "female"):
-                            return {
-                                "reference": hist_entry.speaker,
-                                "confidence": 0.8,
-                                "reasoning": f"基于性别匹配和对话历史"
-                            }
+                indexed = character_index.get(hist_entry.speaker) if hist_entry.speaker else None
+                if indexed and indexed[1] == target_gender:
+                    return {
+                        "reference": hist_entry.speaker,
+                        "confidence": 0.8,
+                        "reasoning": f"基于性别匹配和对话历史"
+                    }
         
         elif pronoun == "我":
             if entry.speaker:
@@ -511,89 +857,50 @@ class ContextAgent:
                                          target_language: str) -> List[str]:
         """生成文化适配建议"""
         recommendations = []
-        
-        genre = adaptation_context.get("genre", "")
         cultural_notes = adaptation_context.get("cultural_notes", [])
         
-        if "军事题材" in cultural_notes:
-            if target_language == "en":
-                recommendations.append("注意军事术语的准确翻译")
-                recommendations.append("保持军事等级制度的体现")
-            elif target_language == "ja":
-                recommendations.append("考虑日本的敬语体系")
-        
-        if "现代背景" in cultural_notes:
-            recommendations.append("使用现代语言表达")
-            recommendations.append("避免过于正式的古典表达")
+        for note in CULTURAL_NOTE_ORDER:
+            if note in cultural_notes:
+                recommendations.extend(CULTURAL_RECOMMENDATIONS.get((note, target_language), ()))
+                recommendations.extend(CULTURAL_RECOMMENDATIONS.get((note, ""), ()))
         
         return recommendations
     
     def _generate_formality_suggestions(self, relationship_info: Dict[str, Any]) -> List[str]:
         """生成正式程度建议"""
-        suggestions = []
-        
         formality = relationship_info.get("formality", "medium")
         respect = relationship_info.get("respect", "neutral")
         
-        if formality == "very_high":
-            suggestions.append("使用非常正式的语言")
-            suggestions.append("避免口语化表达")
-        elif formality == "high":
-            suggestions.append("使用正式语言")
-            suggestions.append("保持礼貌用词")
-        elif formality == "low":
-            suggestions.append("可以使用较为随意的表达")
-            suggestions.append("允许口语化用词")
-        
-        if respect == "high":
-            suggestions.append("体现尊敬态度")
-        elif respect == "caring":
-            suggestions.append("体现关爱情感")
-        
-        return suggestions
-    
-    def _generate_address_recommendations(self, speaker: Optional[str], 
-                                        addressee: Optional[str],
-                                        story_context: StoryContext) -> List[str]:
+        return [*FORMALITY_SUGGESTIONS.get(formality, ()), *RESPECT_SUGGESTIONS.get(respect, ())]
+    
+    def _generate_address_recommendations(self, relationship: Optional[RelationshipConfig]) -> List[str]:
         """生成称谓建议"""
-        recommendations = []
-        
-        if not speaker or not addressee:
-            return recommendations
-        
-        relationship = story_context.get_relationship_between(speaker, addressee)
         if not relationship:
-            return recommendations
-        
-        address_style = relationship.address_style
-        
-        if address_style == "formal_title":
-            recommendations.append("使用正式职务称谓")
-        elif address_style == "brotherhood":
-            recommendations.append("使用战友称谓")
-        elif address_style == "intimate":
-            recommendations.append("使用亲密称谓")
-        elif address_style == "family":
-            recommendations.append("使用家庭称谓")
+            return []
         
-        return recommendations
+        return list(ADDRESS_STYLE_RECOMMENDATIONS.get(relationship.address_style, ()))
     
     def _analyze_dialogue_flow(self, entries: List[SubtitleEntry]) -> Dict[str, Any]:
         """分析对话流程"""
         if not entries:
             return {}
         
-        speakers = [entry.speaker for entry in entries if entry.speaker]
-        unique_speakers = list(set(speakers))
-        
-        # 分析对话轮换
+        # 单次遍历统计说话人、对话轮换和文本长度
+        speaker_set = set()
         speaker_changes = 0
-        for i in range(1, len(speakers)):
-            if speakers[i] != speakers[i-1]:
-                speaker_changes += 1
-        
-        # 分析对话长度
-        avg_length = sum(len(entry.text) for entry in entries) / len(entries)
+        previous_speaker = None
+        total_length = 0
+        for entry in entries:
+            speaker = entry.speaker
+            if speaker:
+                speaker_set.add(speaker)
+                if previous_speaker is not None and speaker != previous_speaker:
+                    speaker_changes += 1
+                previous_speaker = speaker
+            total_length += len(entry.text)
+        
+        unique_speakers = list(speaker_set)
+        avg_length = total_length / len(entries)
         
         return {
             "total_entries": len(entries),
@@ -618,17 +925,13 @@ class ContextAgent:
         self.performance_metrics["average_response_time"] = new_avg
         
         # 更新查询类型统计
-        if query_type not in self.performance_metrics["query_types"]:
-            self.performance_metrics["query_types"][query_type] = {"count": 0, "success_rate": 0.0}
-        
-        type_stats = self.performance_metrics["query_types"][query_type]
+        type_stats = self.performance_metrics["query_types"].setdefault(
+            query_type, {"count": 0, "successful": 0, "success_rate": 0.0}
+        )
         type_stats["count"] += 1
-        
         if success:
-            type_stats["success_rate"] = (type_stats.get("successful", 0) + 1) / type_stats["count"]
-            type_stats["successful"] = type_stats.get("successful", 0) + 1
-        else:
-            type_stats["success_rate"] = type_stats.get("successful", 0) / type_stats["count"]
+            type_stats["successful"] += 1
+        type_stats["success_rate"] = type_stats["successful"] / type_stats["count"]
     
     def get_agent_status(self) -> Dict[str, Any]:
         """获取 Agent 状态"""
@@ -637,16 +940,26 @@ class ContextAgent:
             "active_sessions": len(self.active_sessions),
             "session_details": self.active_sessions,
             "query_history_length": len(self.query_history),
+            "query_cache_size": len(self._query_cache),
             "performance_metrics": self.performance_metrics,
             "supported_query_types": list(self.query_processors.keys())
         }
     
+    def close(self):
+        """释放 Agent 持有的线程池和持久化缓存连接"""
+        self.context_manager.remove_clear_callback(self._on_project_cache_cleared)
+        self._executor.shutdown(wait=True)
+        self._disk_cache.close()
+        logger.info("上下文管理 Agent 已关闭", agent_id=self.agent_id)
+    
     def reset_metrics(self):
         """重置性能指标"""
         self.performance_metrics = {
             "total_queries": 0,
             "successful_queries": 0,
             "average_response_time": 0.0,
+            "cache_hits": 0,
+            "cache_misses": 0,
             "query_types": {}
         }
         logger.info("性能指标已重置")
@@ -661,74 +974,122 @@ def get_context_agent() -> ContextAgent:
     return context_agent
 
 
+# 上下文管理工具定义（只读，Strands SDK 工具 schema）
+_CONTEXT_TOOLS_SCHEMA: Tuple[Dict[str, Any], ...] = (
+    {
+        "name": "infer_speaker",
+        "description": "推断字幕条目的说话人",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "project_id": {"type": "string", "description": "项目ID"},
+                "subtitle_entry": {"type": "object", "description": "字幕条目"},
+                "dialogue_history": {"type": "array", "description": "对话历史"}
+            },
+            "required": ["project_id", "subtitle_entry"]
+        }
+    },
+    {
+        "name": "resolve_pronouns",
+        "description": "解析文本中的代词指代",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "project_id": {"type": "string", "description": "项目ID"},
+                "subtitle_entry": {"type": "object", "description": "字幕条目"},
+                "dialogue_history": {"type": "array", "description": "对话历史"}
+            },
+            "required": ["project_id", "subtitle_entry"]
+        }
+    },
+    {
+        "name": "get_cultural_adaptation",
+        "description": "获取文化适配建议",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "project_id": {"type": "string", "description": "项目ID"},
+                "target_language": {"type": "string", "description": "目标语言"},
+                "subtitle_entry": {"type": "object", "description": "字幕条目"}
+            },
+            "required": ["project_id", "target_language"]
+        }
+    },
+    {
+        "name": "analyze_relationship",
+        "description": "分析人物关系",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "project_id": {"type": "string", "description": "项目ID"},
+                "subtitle_entry": {"type": "object", "description": "字幕条目"},
+                "dialogue_history": {"type": "array", "description": "对话历史"}
+            },
+            "required": ["project_id", "subtitle_entry"]
+        }
+    },
+    {
+        "name": "get_context_summary",
+        "description": "获取项目上下文摘要",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "project_id": {"type": "string", "description": "项目ID"}
+            },
+            "required": ["project_id"]
+        }
+    }
+)
+
+
 # Agent 工具函数，用于与 Strands SDK 集成
 def create_context_tools() -> List[Dict[str, Any]]:
-    """创建上下文管理工具列表，用于 Strands SDK"""
-    return [
-        {
-            "name": "infer_speaker",
-            "description": "推断字幕条目的说话人",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "project_id": {"type": "string", "description": "项目ID"},
-                    "subtitle_entry": {"type": "object", "description": "字幕条目"},
-                    "dialogue_history": {"type": "array", "description": "对话历史"}
-                },
-                "required": ["project_id", "subtitle_entry"]
-            }
-        },
-        {
-            "name": "resolve_pronouns",
-            "description": "解析文本中的代词指代",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "project_id": {"type": "string", "description": "项目ID"},
-                    "subtitle_entry": {"type": "object", "description": "字幕条目"},
-                    "dialogue_history": {"type": "array", "description": "对话历史"}
-                },
-                "required": ["project_id", "subtitle_entry"]
-            }
-        },
-        {
-            "name": "get_cultural_adaptation",
-            "description": "获取文化适配建议",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "project_id": {"type": "string", "description": "项目ID"},
-                    "target_language": {"type": "string", "description": "目标语言"},
-                    "subtitle_entry": {"type": "object", "description": "字幕条目"}
-                },
-                "required": ["project_id", "target_language"]
-            }
-        },
-        {
-            "name": "analyze_relationship",
-            "description": "分析人物关系",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "project_id": {"type": "string", "description": "项目ID"},
-                    "subtitle_entry": {"type": "object", "description": "字幕条目"},
-                    "dialogue_history": {"type": "array", "description": "对话历史"}
-                },
-                "required": ["project_id", "subtitle_entry"]
-            }
-        },
-        {
-            "name": "get_context_summary",
-            "description": "获取项目上下文摘要",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "project_id": {"type": "string", "description": "项目ID"}
-                },
-                "required": ["project_id"]
-            }
-        }
-    ]
+    """创建上下文管理工具列表，用于 Strands SDK
+    
+    返回顶层字典的副本，嵌套的参数 schema 与模块常量共享，调用方不应修改
+    """
+    return [dict(tool) for tool in _CONTEXT_TOOLS_SCHEMA]
+
+
+def _build_dialogue_tool_query(parameters: Dict[str, Any], query_type: str) -> ContextQuery:
+    """构建基于字幕条目和对话历史的查询"""
+    return ContextQuery(
+        query_id=str(uuid.uuid4()),
+        project_id=parameters["project_id"],
+        query_type=query_type,
+        subtitle_entry=parameters["subtitle_entry"],
+        dialogue_history=parameters.get("dialogue_history", [])
+    )
+
+
+def _build_cultural_tool_query(parameters: Dict[str, Any]) -> ContextQuery:
+    """构建文化适配查询"""
+    return ContextQuery(
+        query_id=str(uuid.uuid4()),
+        project_id=parameters["project_id"],
+        query_type="cultural_adaptation",
+        target_language=parameters["target_language"],
+        subtitle_entry=parameters.get("subtitle_entry")
+    )
+
+
+def _build_summary_tool_query(parameters: Dict[str, Any]) -> ContextQuery:
+    """构建上下文摘要查询"""
+    return ContextQuery(
+        query_id=str(uuid.uuid4()),
+        project_id=parameters["project_id"],
+        query_type="context_summary"
+    )
+
+
+# 工具名 -> 查询构建函数
+_TOOL_QUERY_BUILDERS: Dict[str, Callable[[Dict[str, Any]], ContextQuery]] = {
+    "infer_speaker": lambda parameters: _build_dialogue_tool_query(parameters, "speaker_inference"),
+    "resolve_pronouns": lambda parameters: _build_dialogue_tool_query(parameters, "pronoun_resolution"),
+    "get_cultural_adaptation": _build_cultural_tool_query,
+    "analyze_relationship": lambda parameters: _build_dialogue_tool_query(parameters, "relationship_analysis"),
+    "get_context_summary": _build_summary_tool_query,
+}
 
 
 def execute_context_tool(tool_name: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
@@ -736,52 +1097,12 @@ def execute_context_tool(tool_name: str, parameters: Dict[str, Any]) -> Dict[str
     agent = get_context_agent()
     
     try:
-        if tool_name == "infer_speaker":
-            query = ContextQuery(
-                query_id=str(uuid.uuid4()),
-                project_id=parameters["project_id"],
-                query_type="speaker_inference",
-                subtitle_entry=parameters["subtitle_entry"],
-                dialogue_history=parameters.get("dialogue_history", [])
-            )
-            
-        elif tool_name == "resolve_pronouns":
-            query = ContextQuery(
-                query_id=str(uuid.uuid4()),
-                project_id=parameters["project_id"],
-                query_type="pronoun_resolution",
-                subtitle_entry=parameters["subtitle_entry"],
-                dialogue_history=parameters.get("dialogue_history", [])
-            )
-            
-        elif tool_name == "get_cultural_adaptation":
-            query = ContextQuery(
-                query_id=str(uuid.uuid4()),
-                project_id=parameters["project_id"],
-                query_type="cultural_adaptation",
-                target_language=parameters["target_language"],
-                subtitle_entry=parameters.get("subtitle_entry")
-            )
-            
-        elif tool_name == "analyze_relationship":
-            query = ContextQuery(
-                query_id=str(uuid.uuid4()),
-                project_id=parameters["project_id"],
-                query_type="relationship_analysis",
-                subtitle_entry=parameters["subtitle_entry"],
-                dialogue_history=parameters.get("dialogue_history", [])
-            )
-            
-        elif tool_name == "get_context_summary":
-            query = ContextQuery(
-                query_id=str(uuid.uuid4()),
-                project_id=parameters["project_id"],
-                query_type="context_summary"
-            )
-            
-        else:
+        build_query = _TOOL_QUERY_BUILDERS.get(tool_name)
+        if build_query is None:
             return {"error": f"未知的工具: {tool_name}"}
         
+        query = build_query(parameters)
+        
         # 处理查询
         response = agent.process_query(query)
         
@@ -4,7 +4,7 @@
 """
 import json
 import hashlib
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from pathlib import Path
 from collections import deque
 
@@ -29,9 +29,20 @@ class ContextManager:
         self.project_manager = get_project_manager()
         self.loaded_contexts: Dict[str, StoryContext] = {}
         self.dialogue_histories: Dict[str, DialogueContext] = {}
+        # 清除项目缓存时通知的回调，参数为项目ID
+        self._clear_callbacks: List[Callable[[str], None]] = []
         
         logger.info("上下文管理器初始化完成")
     
+    def add_clear_callback(self, callback: Callable[[str], None]):
+        """注册项目缓存清除回调，用于失效基于项目上下文的派生缓存"""
+        self._clear_callbacks.append(callback)
+    
+    def remove_clear_callback(self, callback: Callable[[str], None]):
+        """注销项目缓存清除回调"""
+        if callback in self._clear_callbacks:
+            self._clear_callbacks.remove(callback)
+    
     def load_project_context(self, project_id: str) -> StoryContext:
         """加载项目上下文"""
         if project_id in self.loaded_contexts:
@@ -527,6 +538,9 @@ class ContextManager:
         if project_id in self.dialogue_histories:
             del self.dialogue_histories[project_id]
         
+        for callback in list(self._clear_callbacks):
+            callback(project_id)
+        
         logger.info("项目缓存已清除", project_id=project_id)
     
     def get_context_statistics(self, project_id: str) -> Dict[str, Any]:
@@ -3,20 +3,66 @@
 负责解析SRT字幕文件和剧情文档
 集成上下文管理器的说话人推断和人物关系分析功能
 """
+import os
 import re
 import json
-from typing import List, Dict, Optional, Any, Tuple
+import threading
+from functools import lru_cache
+from collections import Counter
+from itertools import chain, islice
+from typing import List, Dict, Optional, Any, Tuple, Sequence
 from pathlib import Path
 from datetime import datetime, timedelta
 from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 
 from config import get_logger
-from models.subtitle_models import SubtitleEntry, SubtitleFile
+from models.subtitle_models import SubtitleEntry, SubtitleFile, TimeCode
 from models.story_models import CharacterRelation, StoryContext
 from agents.context_manager import get_context_manager
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    # pyahocorasick：一次线性扫描匹配全部情感关键词
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 logger = get_logger("file_parser")
 
+# 编码检测采样字节数（文件开头部分已足以判断编码）
+ENCODING_SAMPLE_SIZE = 8192
+
+
+def _file_extension(file_path: str) -> str:
+    """获取小写文件扩展名（结果与 Path(file_path).suffix.lower() 一致，但不构造Path对象）"""
+    if os.altsep:
+        file_path = file_path.replace(os.altsep, os.sep)
+    name = file_path.rstrip(os.sep).rpartition(os.sep)[2]
+    dot = name.rfind('.')
+    return name[dot:].lower() if 0 < dot < len(name) - 1 else ''
+
+
+def _collapse_cleanup_match(match: 're.Match') -> str:
+    """清理正则的替换函数：含空白的片段折叠为一个空格，纯标签片段直接删除"""
+    return ' ' if match.group(1) else ''
+
+
+@lru_cache(maxsize=256)
+def _compile_speaker_patterns(speaker: str) -> Tuple['re.Pattern', ...]:
+    """编译指定说话人的前缀匹配正则（按说话人缓存）"""
+    escaped = re.escape(speaker)
+    return (
+        re.compile(rf'^{escaped}[：:]\s*'),
+        re.compile(rf'^{escaped}-\s*'),
+        re.compile(rf'^\[{escaped}\]\s*'),
+        re.compile(rf'^\({escaped}\)\s*'),
+    )
+
 
 @dataclass
 class ParseResult:
@@ -36,35 +82,124 @@ class ParseResult:
             self.metadata = {}
 
 
+class _EntryWindow(Sequence):
+    """字幕条目列表的只读区间视图
+    
+    说话人推断需要为每条字幕取前后若干条作为上下文，使用视图避免每次切片复制列表。
+    """
+    
+    __slots__ = ("_entries", "_start", "_stop")
+    
+    def __init__(self, entries: List[SubtitleEntry], start: int, stop: int):
+        self._entries = entries
+        self._start = start
+        self._stop = stop
+    
+    def __len__(self) -> int:
+        return self._stop - self._start
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._entries[i] for i in range(self._start, self._stop)[index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("上下文窗口索引越界")
+        return self._entries[self._start + index]
+    
+    def __iter__(self):
+        return islice(self._entries, self._start, self._stop)
+
+
 class SRTParser:
     """SRT字幕文件解析器
     
     支持标准SRT格式解析，处理时间码、文本和格式异常
     """
     
+    # 文本清理正则（类级别预编译，所有实例共享）：一次扫描同时移除HTML标签、
+    # 字幕格式标记并折叠空白；连续的标签和空白作为一段处理，段内含空白时替换为单个空格
+    CLEANUP_PATTERN = re.compile(r'(?:<[^>]+>|\{[^}]+\}|(\s))+')
+    
+    # 情感关键词（按优先级排列，同时命中多个情感时取靠前的一个）
+    EMOTION_KEYWORDS = {
+        "angry": ["生气", "愤怒", "气死", "混蛋", "该死"],
+        "sad": ["难过", "伤心", "哭", "眼泪", "痛苦"],
+        "happy": ["高兴", "开心", "笑", "快乐", "兴奋"],
+        "nervous": ["紧张", "担心", "害怕", "恐惧", "焦虑"],
+        "serious": ["严肃", "重要", "关键", "紧急", "危险"]
+    }
+    
+    # 说话人名称中不允许出现的标点（删除表：translate后与原名不同即包含非法字符）
+    INVALID_NAME_CHARS_TABLE = str.maketrans('', '', '.,!?;()[]{}"\'')
+    
+    # 明显不是人名的词汇
+    INVALID_SPEAKER_WORDS = frozenset(["重要通知", "通知", "公告", "消息", "新闻", "报告", "声明"])
+    
+    # 连续中文字符片段
+    CJK_RUN_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+    
     def __init__(self):
         # SRT时间码正则表达式
         self.time_pattern = re.compile(
-            r'(\d{2}):(\d{2}):(\d{2}),(\d{3})\s*-->\s*(\d{2}):(\d{2}):(\d{2}),(\d{3})'
+            r'(\d{2}:\d{2}:\d{2},\d{3})\s*-->\s*(\d{2}:\d{2}:\d{2},\d{3})'
         )
         
         # 字幕编号正则表达式
         self.number_pattern = re.compile(r'^\d+$')
         
+        # 完整字幕块正则：一次匹配同时取出编号、起止时间码和文本
+        self.entry_pattern = re.compile(
+            r'(\d+)[^\S\n]*\n[^\S\n]*'
+            r'(\d{2}:\d{2}:\d{2},\d{3})[^\S\n]*-->[^\S\n]*(\d{2}:\d{2}:\d{2},\d{3})'
+            r'[^\n]*\n(.*)',
+            re.DOTALL
+        )
+        self.block_separator = re.compile(r'\n\s*\n')
+        
         # 支持的编码格式
         self.supported_encodings = ['utf-8', 'utf-8-sig', 'gbk', 'gb2312', 'big5']
         
         self.context_manager = get_context_manager()
+        
+        # 选择后台分析时，上下文分析（说话人推断、情感分析）在此线程池执行，不阻塞解析结果返回；
+        # 线程池在首次选择后台分析时才创建（批量解析的进程池工作进程不会用到）
+        self._analysis_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        
+        # 关键词 -> (情感优先级, 情感)
+        self.emotion_ranks = {
+            keyword: (priority, emotion)
+            for priority, (emotion, keywords) in enumerate(self.EMOTION_KEYWORDS.items())
+            for keyword in keywords
+        }
+        self.emotion_automaton = self._build_emotion_automaton()
+        # 未安装pyahocorasick时，使用全部关键词合并成的单个正则
+        self.emotion_pattern = re.compile('|'.join(map(re.escape, self.emotion_ranks)))
     
-    def parse_file(self, file_path: str, project_id: str = None) -> ParseResult:
+    def _build_emotion_automaton(self):
+        """构建情感关键词自动机（未安装pyahocorasick时返回None）"""
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for keyword, rank in self.emotion_ranks.items():
+            automaton.add_word(keyword, rank)
+        automaton.make_automaton()
+        return automaton
+    
+    def parse_file(self, file_path: str, project_id: str = None,
+                   background_analysis: bool = False) -> ParseResult:
         """解析SRT文件
         
         Args:
             file_path: SRT文件路径
             project_id: 项目ID（用于上下文分析）
+            background_analysis: 是否在后台线程进行上下文分析
             
         Returns:
-            解析结果
+            解析结果。默认在返回前完成上下文分析；选择后台分析时，需要推断的
+            说话人和情感信息的调用方应先等待 subtitle_file.analysis_future 完成
         """
         try:
             file_path = Path(file_path)
@@ -75,15 +210,17 @@ class SRTParser:
                 )
             
             # 尝试不同编码读取文件
-            content = self._read_file_with_encoding(file_path)
-            if content is None:
+            read_result = self._read_file_with_encoding(file_path)
+            if read_result is None:
                 return ParseResult(
                     success=False,
                     errors=["无法读取文件，可能是编码问题"]
                 )
             
+            content, encoding = read_result
+            
             # 解析SRT内容
-            entries, errors, warnings = self._parse_srt_content(content)
+            entries, errors, warnings, has_speaker_info = self._parse_srt_content(content)
             
             # 创建字幕文件对象
             from models.subtitle_models import SubtitleFormat
@@ -91,13 +228,19 @@ class SRTParser:
                 filename=str(file_path),
                 format=SubtitleFormat.SRT,
                 entries=entries,
-                encoding=self._detect_encoding(file_path),
+                encoding=encoding,
                 created_at=datetime.now()
             )
             
-            # 如果有项目ID，进行上下文分析
+            # 如果有项目ID，进行上下文分析（可选在后台进行）
             if project_id and entries:
-                self._analyze_context(subtitle_file, project_id)
+                if background_analysis:
+                    subtitle_file.analysis_future = self._get_analysis_executor().submit(
+                        self._analyze_context, subtitle_file, project_id
+                    )
+                else:
+                    self._analyze_context(subtitle_file, project_id)
+                    has_speaker_info = any(entry.speaker for entry in entries)
             
             return ParseResult(
                 success=True,
@@ -108,7 +251,7 @@ class SRTParser:
                     "total_entries": len(entries),
                     "duration_seconds": subtitle_file.total_duration,
                     "encoding": subtitle_file.encoding,
-                    "has_speaker_info": any(entry.speaker for entry in entries)
+                    "has_speaker_info": has_speaker_info
                 }
             )
             
@@ -119,53 +262,123 @@ class SRTParser:
                 errors=[f"解析失败: {str(e)}"]
             )
     
-    def _read_file_with_encoding(self, file_path: Path) -> Optional[str]:
-        """尝试不同编码读取文件"""
+    def _get_analysis_executor(self) -> ThreadPoolExecutor:
+        """获取后台分析线程池（首次调用时创建）"""
+        with self._executor_lock:
+            if self._analysis_executor is None:
+                self._analysis_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="srt_context")
+            return self._analysis_executor
+    
+    def close(self, wait: bool = True):
+        """关闭后台分析线程池
+        
+        Args:
+            wait: 是否等待尚未完成的上下文分析结束
+        """
+        with self._executor_lock:
+            executor, self._analysis_executor = self._analysis_executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+    
+    def _read_file_with_encoding(self, file_path: Path) -> Optional[Tuple[str, str]]:
+        """尝试不同编码读取文件
+        
+        文件只读取一次，之后在内存中依次尝试各编码解码。
+        
+        Returns:
+            (文件内容, 实际使用的编码)，全部编码均失败时返回None
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                raw_data = f.read()
+        except Exception as e:
+            logger.warning("读取文件失败", error=str(e))
+            return None
+        
         for encoding in self.supported_encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                logger.debug("文件读取成功", encoding=encoding)
-                return content
-            except UnicodeDecodeError:
-                continue
-            except Exception as e:
-                logger.warning("读取文件失败", encoding=encoding, error=str(e))
-                continue
+            content = self._decode_content(raw_data, encoding)
+            if content is not None:
+                return content, encoding
+        
+        # 常用编码都失败时，再尝试检测出的编码
+        detected_encoding = self._detect_encoding(raw_data[:ENCODING_SAMPLE_SIZE])
+        if detected_encoding not in self.supported_encodings:
+            content = self._decode_content(raw_data, detected_encoding)
+            if content is not None:
+                return content, detected_encoding
         
         return None
     
-    def _detect_encoding(self, file_path: Path) -> str:
-        """检测文件编码"""
+    def _decode_content(self, raw_data: bytes, encoding: str) -> Optional[str]:
+        """按指定编码解码文件内容，并统一换行符（与文本模式读取一致）"""
+        try:
+            content = raw_data.decode(encoding)
+        except UnicodeDecodeError:
+            return None
+        except Exception as e:
+            logger.warning("读取文件失败", encoding=encoding, error=str(e))
+            return None
+        
+        logger.debug("文件读取成功", encoding=encoding)
+        return content.replace('\r\n', '\n').replace('\r', '\n')
+    
+    def _detect_encoding(self, sample: bytes) -> str:
+        """检测编码（只需文件开头的采样数据）"""
+        try:
+            from charset_normalizer import from_bytes
+            best_match = from_bytes(sample).best()
+            return best_match.encoding if best_match else 'utf-8'
+        except ImportError:
+            pass
+        except Exception:
+            return 'utf-8'
+        
         try:
             import chardet
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-            result = chardet.detect(raw_data)
-            return result.get('encoding', 'utf-8')
+            result = chardet.detect(sample)
+            return result.get('encoding') or 'utf-8'
         except ImportError:
-            # 如果没有chardet，使用默认编码
+            # 如果没有检测库，使用默认编码
             return 'utf-8'
         except Exception:
             return 'utf-8'
     
-    def _parse_srt_content(self, content: str) -> Tuple[List[SubtitleEntry], List[str], List[str]]:
-        """解析SRT内容"""
+    def _parse_srt_content(self, content: str) -> Tuple[List[SubtitleEntry], List[str], List[str], bool]:
+        """解析SRT内容
+        
+        Returns:
+            (字幕条目, 错误, 警告, 是否有条目带说话人信息)
+        """
         entries = []
         errors = []
         warnings = []
+        has_speaker_info = False
         
         # 分割字幕块
-        blocks = re.split(r'\n\s*\n', content.strip())
+        blocks = self.block_separator.split(content.strip())
+        entry_match = self.entry_pattern.fullmatch
         
         for i, block in enumerate(blocks):
-            if not block.strip():
+            block = block.strip()
+            if not block:
                 continue
             
             try:
-                entry = self._parse_subtitle_block(block, i + 1)
+                # 格式规范的字幕块一次正则匹配完成解析，其余交给逐行解析以给出具体错误
+                match = entry_match(block)
+                if match:
+                    number, start, end, text = match.groups()
+                    entry = self._build_entry(
+                        int(number),
+                        TimeCode.from_srt_str(start),
+                        TimeCode.from_srt_str(end),
+                        text.strip()
+                    )
+                else:
+                    entry = self._parse_subtitle_block(block, i + 1)
                 if entry:
                     entries.append(entry)
+                    has_speaker_info = has_speaker_info or bool(entry.speaker)
                 else:
                     warnings.append(f"跳过空白字幕块 {i + 1}")
             except Exception as e:
@@ -176,7 +389,7 @@ class SRTParser:
         time_errors = self._validate_time_sequence(entries)
         errors.extend(time_errors)
         
-        return entries, errors, warnings
+        return entries, errors, warnings, has_speaker_info
     
     def _parse_subtitle_block(self, block: str, block_number: int) -> Optional[SubtitleEntry]:
         """解析单个字幕块"""
@@ -198,23 +411,19 @@ class SRTParser:
         if not time_match:
             raise ValueError(f"无效的时间码格式: {time_line}")
         
-        start_time = self._parse_timestamp(time_match.groups()[:4])
-        end_time = self._parse_timestamp(time_match.groups()[4:])
+        start_time = TimeCode.from_srt_str(time_match.group(1))
+        end_time = TimeCode.from_srt_str(time_match.group(2))
         
         # 解析文本内容
         text_lines = lines[2:]
         text = '\n'.join(text_lines).strip()
         
-        # 清理HTML标签和格式标记
-        clean_text = self._clean_subtitle_text(text)
-        
-        # 提取说话人信息（如果有）
-        speaker = self._extract_speaker(clean_text)
-        if speaker:
-            clean_text = self._remove_speaker_prefix(clean_text, speaker)
-        
-        # 计算字符数（中文按2个字符计算）
-        char_count = self._count_characters(clean_text)
+        return self._build_entry(subtitle_number, start_time, end_time, text)
+    
+    def _build_entry(self, subtitle_number: int, start_time: TimeCode,
+                     end_time: TimeCode, text: str) -> SubtitleEntry:
+        """根据解析出的字段构建字幕条目"""
+        clean_text, speaker, char_count = self._normalize_and_analyze(text)
         
         # 计算显示时长（使用毫秒数）
         duration = (end_time.to_milliseconds() - start_time.to_milliseconds()) / 1000.0
@@ -233,47 +442,64 @@ class SRTParser:
         
         return entry
     
-    def _parse_timestamp(self, time_parts: Tuple[str, str, str, str]) -> 'TimeCode':
-        """解析时间戳"""
-        from models.subtitle_models import TimeCode
+    def _normalize_and_analyze(self, text: str) -> Tuple[str, Optional[str], int]:
+        """清理文本、提取并移除说话人前缀、计算字符数
         
-        hours, minutes, seconds, milliseconds = time_parts
+        Returns:
+            (清理后的文本, 说话人, 字符数（中文按2个字符计算）)
+        """
+        # 清理HTML标签和格式标记
+        clean_text = self._clean_subtitle_text(text)
         
-        return TimeCode(
-            hours=int(hours),
-            minutes=int(minutes),
-            seconds=int(seconds),
-            milliseconds=int(milliseconds)
-        )
+        # 提取说话人信息（如果有）
+        speaker = self._extract_speaker(clean_text)
+        if speaker:
+            clean_text = self._strip_speaker_prefix(clean_text, speaker)
+        
+        return clean_text, speaker, self._count_characters(clean_text)
+    
+    def _strip_speaker_prefix(self, text: str, speaker: str) -> str:
+        """移除说话人前缀：常见格式直接按位置切片，其余情况交给正则处理"""
+        for prefix in (f'{speaker}：', f'{speaker}:', f'{speaker}-', f'[{speaker}]', f'({speaker})'):
+            if text.startswith(prefix):
+                rest = text[len(prefix):].lstrip()
+                # 剩余文本可能还会命中后续前缀格式，此时按原逻辑逐个正则处理
+                if not rest.startswith((speaker, '[', '(')):
+                    return rest.strip()
+                break
+        
+        return self._remove_speaker_prefix(text, speaker)
     
     def _clean_subtitle_text(self, text: str) -> str:
         """清理字幕文本"""
-        # 移除HTML标签
-        text = re.sub(r'<[^>]+>', '', text)
-        
-        # 移除字幕格式标记
-        text = re.sub(r'\{[^}]+\}', '', text)
-        
-        # 移除多余的空白字符
-        text = re.sub(r'\s+', ' ', text).strip()
-        
-        return text
+        return self.CLEANUP_PATTERN.sub(_collapse_cleanup_match, text).strip()
     
     def _extract_speaker(self, text: str) -> Optional[str]:
-        """提取说话人信息"""
-        # 常见的说话人格式
-        patterns = [
-            r'^([^：:]+)[：:]\s*',  # 中文冒号
-            r'^([^-]+)-\s*',        # 破折号
-            r'^\[([^\]]+)\]\s*',    # 方括号
-            r'^\(([^)]+)\)\s*',     # 圆括号
-        ]
+        """提取说话人信息
         
-        for pattern in patterns:
-            match = re.match(pattern, text)
-            if match:
-                speaker = match.group(1).strip()
-                # 验证说话人名称的合理性
+        依次尝试常见格式：冒号、破折号、方括号、圆括号，用字符串查找代替正则匹配
+        """
+        # 中文/英文冒号：取第一个冒号之前的内容
+        full_colon = text.find('：')
+        half_colon = text.find(':')
+        colon_index = full_colon if half_colon < 0 or 0 <= full_colon < half_colon else half_colon
+        if colon_index > 0:
+            speaker = text[:colon_index].strip()
+            if self._is_valid_speaker_name(speaker):
+                return speaker
+        
+        # 破折号
+        dash_index = text.find('-')
+        if dash_index > 0:
+            speaker = text[:dash_index].strip()
+            if self._is_valid_speaker_name(speaker):
+                return speaker
+        
+        # 方括号、圆括号
+        if text[:1] in ('[', '('):
+            close_index = text.find(']' if text[0] == '[' else ')', 1)
+            if close_index > 1:
+                speaker = text[1:close_index].strip()
                 if self._is_valid_speaker_name(speaker):
                     return speaker
         
@@ -286,8 +512,7 @@ class SRTParser:
             return False
         
         # 不应该包含标点符号（除了常见的人名标点）
-        invalid_chars = {'.', ',', '!', '?', ';', '(', ')', '[', ']', '{', '}', '"', "'"}
-        if any(char in invalid_chars for char in name):
+        if name.translate(self.INVALID_NAME_CHARS_TABLE) != name:
             return False
         
         # 不应该是纯数字
@@ -295,41 +520,55 @@ class SRTParser:
             return False
         
         # 排除明显不是人名的词汇
-        invalid_words = ["重要通知", "通知", "公告", "消息", "新闻", "报告", "声明"]
-        if name in invalid_words:
+        if name in self.INVALID_SPEAKER_WORDS:
             return False
         
         return True
     
     def _remove_speaker_prefix(self, text: str, speaker: str) -> str:
         """移除说话人前缀"""
-        patterns = [
-            rf'^{re.escape(speaker)}[：:]\s*',
-            rf'^{re.escape(speaker)}-\s*',
-            rf'^\[{re.escape(speaker)}\]\s*',
-            rf'^\({re.escape(speaker)}\)\s*',
-        ]
-        
-        for pattern in patterns:
-            text = re.sub(pattern, '', text)
+        for pattern in _compile_speaker_patterns(speaker):
+            text = pattern.sub('', text)
         
         return text.strip()
     
     def _count_characters(self, text: str) -> int:
         """计算字符数（中文按2个字符计算）"""
-        count = 0
-        for char in text:
-            if '\u4e00' <= char <= '\u9fff':  # 中文字符
-                count += 2
-            else:
-                count += 1
-        return count
+        # 每个字符计1，中文字符（连续片段一次匹配）再额外计1
+        return len(text) + sum(map(len, self.CJK_RUN_PATTERN.findall(text)))
     
     def _validate_time_sequence(self, entries: List[SubtitleEntry]) -> List[str]:
         """验证时间序列"""
+        if np is None or len(entries) < 2:
+            return self._validate_entries(entries, range(len(entries) - 1))
+        
+        # 按列提取时间和字数，用向量化比较筛出有问题的条目，只对这些条目生成错误信息
+        count = len(entries)
+        checked = count - 1
+        starts = np.fromiter((entry.start_time.to_milliseconds() for entry in entries),
+                             dtype=np.int64, count=count)
+        ends = np.fromiter((entry.end_time.to_milliseconds() for entry in entries),
+                           dtype=np.int64, count=count)
+        durations = np.fromiter((entries[i].duration_seconds for i in range(checked)),
+                                dtype=np.float64, count=checked)
+        char_counts = np.fromiter((entries[i].character_count for i in range(checked)),
+                                  dtype=np.float64, count=checked)
+        reading_speeds = char_counts / np.where(durations > 0, durations, np.inf)
+        
+        flagged = np.flatnonzero(
+            (starts[:-1] >= ends[:-1]) |
+            (ends[:-1] > starts[1:]) |
+            (durations < 0.5) |
+            (durations > 10) |
+            (reading_speeds > 20)
+        )
+        return self._validate_entries(entries, flagged.tolist())
+    
+    def _validate_entries(self, entries: List[SubtitleEntry], indices) -> List[str]:
+        """逐条检查指定位置的字幕条目（与下一条比较）"""
         errors = []
         
-        for i in range(len(entries) - 1):
+        for i in indices:
             current = entries[i]
             next_entry = entries[i + 1]
             
@@ -354,14 +593,15 @@ class SRTParser:
         return errors
     
     def _calculate_total_duration(self, entries: List[SubtitleEntry]) -> float:
-        """计算总时长"""
+        """计算总时长
+        
+        条目须已按时间顺序排列（SubtitleFile 会校验条目不重叠），
+        因此首条开始时间和末条结束时间即为整体范围。
+        """
         if not entries:
             return 0.0
         
-        last_entry = max(entries, key=lambda x: x.end_time.to_milliseconds())
-        first_entry = min(entries, key=lambda x: x.start_time.to_milliseconds())
-        
-        return (last_entry.end_time.to_milliseconds() - first_entry.start_time.to_milliseconds()) / 1000.0
+        return (entries[-1].end_time.to_milliseconds() - entries[0].start_time.to_milliseconds()) / 1000.0
     
     def _analyze_context(self, subtitle_file: SubtitleFile, project_id: str):
         """分析字幕上下文"""
@@ -404,33 +644,29 @@ class SRTParser:
                                speaker=inferred_speaker)
     
     def _get_context_entries(self, entries: List[SubtitleEntry], current_index: int, 
-                           window_size: int = 3) -> List[SubtitleEntry]:
-        """获取上下文字幕条目"""
+                           window_size: int = 3) -> Sequence[SubtitleEntry]:
+        """获取上下文字幕条目（只读视图，不复制列表）"""
         start_index = max(0, current_index - window_size)
         end_index = min(len(entries), current_index + window_size + 1)
         
-        return entries[start_index:end_index]
+        return _EntryWindow(entries, start_index, end_index)
     
     def _analyze_scene_emotion(self, subtitle_file: SubtitleFile):
         """分析场景情感"""
-        # 情感关键词
-        emotion_keywords = {
-            "angry": ["生气", "愤怒", "气死", "混蛋", "该死"],
-            "sad": ["难过", "伤心", "哭", "眼泪", "痛苦"],
-            "happy": ["高兴", "开心", "笑", "快乐", "兴奋"],
-            "nervous": ["紧张", "担心", "害怕", "恐惧", "焦虑"],
-            "serious": ["严肃", "重要", "关键", "紧急", "危险"]
-        }
+        automaton = self.emotion_automaton
         
         for entry in subtitle_file.entries:
-            emotions = []
-            
-            for emotion, keywords in emotion_keywords.items():
-                if any(keyword in entry.text for keyword in keywords):
-                    emotions.append(emotion)
+            if automaton is not None:
+                # 一次遍历取出所有命中的关键词，按情感优先级取第一个
+                matches = [value for _, value in automaton.iter(entry.text)]
+                emotion = min(matches)[1] if matches else None
+            else:
+                matches = [self.emotion_ranks[keyword]
+                           for keyword in self.emotion_pattern.findall(entry.text)]
+                emotion = min(matches)[1] if matches else None
             
-            if emotions:
-                entry.emotion = emotions[0]  # 取第一个匹配的情感
+            if emotion:
+                entry.emotion = emotion  # 取第一个匹配的情感
                 entry.emotion_confidence = 0.6
 
 
@@ -742,27 +978,39 @@ class FileParserAgent:
         
         logger.info("文件解析Agent初始化完成")
     
+    def close(self):
+        """释放解析器持有的后台分析线程池"""
+        self.srt_parser.close()
+    
     def parse_subtitle_file(self, file_path: str, project_id: str = None) -> ParseResult:
         """解析字幕文件"""
         logger.info("开始解析字幕文件", file_path=file_path, project_id=project_id)
         
         result = self.srt_parser.parse_file(file_path, project_id)
+        self._log_subtitle_result(result)
         
+        return result
+    
+    def _log_subtitle_result(self, result: ParseResult):
+        """记录字幕文件解析结果"""
         if result.success:
             logger.info("字幕文件解析成功", 
                        entries_count=result.metadata.get("total_entries", 0),
                        duration=result.metadata.get("duration_seconds", 0))
         else:
             logger.error("字幕文件解析失败", errors=result.errors)
-        
-        return result
     
     def parse_story_document(self, file_path: str, project_id: str) -> ParseResult:
         """解析剧情文档"""
         logger.info("开始解析剧情文档", file_path=file_path, project_id=project_id)
         
         result = self.story_parser.parse_story_document(file_path, project_id)
+        self._store_story_result(result, project_id)
         
+        return result
+    
+    def _store_story_result(self, result: ParseResult, project_id: str):
+        """将剧情文档解析结果存储到上下文管理器"""
         if result.success:
             # 将解析结果存储到上下文管理器
             story_context = result.data
@@ -773,22 +1021,33 @@ class FileParserAgent:
                        relationships_count=result.metadata.get("relationships_count", 0))
         else:
             logger.error("剧情文档解析失败", errors=result.errors)
-        
-        return result
     
     def batch_parse_files(self, file_paths: List[str], project_id: str) -> Dict[str, ParseResult]:
-        """批量解析文件"""
+        """批量解析文件
+        
+        文件解析在进程池中并行执行；依赖上下文管理器的步骤（剧情存储、
+        说话人推断）仍在主进程中按原顺序完成。
+        """
         results = {}
         
         logger.info("开始批量解析文件", files_count=len(file_paths), project_id=project_id)
         
+        parsed = self._parse_files_parallel(file_paths, project_id)
+        
         for file_path in file_paths:
             file_path = Path(file_path)
             
             if file_path.suffix.lower() == '.srt':
-                result = self.parse_subtitle_file(str(file_path), project_id)
+                result = parsed[str(file_path)]
+                if result.success and project_id and result.data.entries:
+                    self.srt_parser._analyze_context(result.data, project_id)
+                    result.metadata["has_speaker_info"] = any(
+                        entry.speaker for entry in result.data.entries
+                    )
+                self._log_subtitle_result(result)
             elif file_path.suffix.lower() in ['.md', '.txt']:
-                result = self.parse_story_document(str(file_path), project_id)
+                result = parsed[str(file_path)]
+                self._store_story_result(result, project_id)
             else:
                 result = ParseResult(
                     success=False,
@@ -806,6 +1065,27 @@ class FileParserAgent:
         
         return results
     
+    def _parse_files_parallel(self, file_paths: List[str], project_id: str) -> Dict[str, ParseResult]:
+        """使用进程池并行解析支持的文件"""
+        parse_paths = list(dict.fromkeys(
+            str(Path(file_path)) for file_path in file_paths
+            if Path(file_path).suffix.lower() in SUPPORTED_PARSE_SUFFIXES
+        ))
+        
+        if len(parse_paths) > 1:
+            try:
+                max_workers = min(len(parse_paths), os.cpu_count() or 1)
+                with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                    futures = {
+                        executor.submit(_parse_one, file_path, project_id): file_path
+                        for file_path in parse_paths
+                    }
+                    return {futures[future]: future.result() for future in as_completed(futures)}
+            except Exception as e:
+                logger.warning("并行解析失败，改为顺序解析", error=str(e))
+        
+        return {file_path: _parse_one(file_path, project_id) for file_path in parse_paths}
+    
     def validate_subtitle_file(self, subtitle_file: SubtitleFile) -> List[str]:
         """验证字幕文件质量"""
         issues = []
@@ -835,39 +1115,52 @@ class FileParserAgent:
     
     def get_parsing_statistics(self, results: Dict[str, ParseResult]) -> Dict[str, Any]:
         """获取解析统计信息"""
-        stats = {
-            "total_files": len(results),
-            "successful_files": 0,
-            "failed_files": 0,
-            "total_subtitle_entries": 0,
-            "total_characters": 0,
-            "total_relationships": 0,
-            "file_types": {},
-            "errors": []
-        }
+        # 一次遍历，累加到局部变量，最后统一写入结果字典
+        successful_files = 0
+        total_entries = total_characters = total_relationships = 0
+        failed_errors = []
         
-        for file_path, result in results.items():
-            file_ext = Path(file_path).suffix.lower()
-            stats["file_types"][file_ext] = stats["file_types"].get(file_ext, 0) + 1
-            
+        for result in results.values():
             if result.success:
-                stats["successful_files"] += 1
-                
-                if result.metadata:
-                    stats["total_subtitle_entries"] += result.metadata.get("total_entries", 0)
-                    stats["total_characters"] += result.metadata.get("characters_count", 0)
-                    stats["total_relationships"] += result.metadata.get("relationships_count", 0)
+                successful_files += 1
+                metadata = result.metadata
+                if metadata:
+                    total_entries += metadata.get("total_entries", 0)
+                    total_characters += metadata.get("characters_count", 0)
+                    total_relationships += metadata.get("relationships_count", 0)
             else:
-                stats["failed_files"] += 1
-                stats["errors"].extend(result.errors)
+                failed_errors.append(result.errors)
+        
+        stats = {
+            "total_files": len(results),
+            "successful_files": successful_files,
+            "failed_files": len(results) - successful_files,
+            "total_subtitle_entries": total_entries,
+            "total_characters": total_characters,
+            "total_relationships": total_relationships,
+            "file_types": dict(Counter(_file_extension(file_path) for file_path in results)),
+            "errors": list(chain.from_iterable(failed_errors))
+        }
         
         return stats
 
 
-# 全局文件解析Agent实例
-file_parser_agent = FileParserAgent()
+# 批量解析时交给进程池处理的文件类型
+SUPPORTED_PARSE_SUFFIXES = ('.srt', '.md', '.txt')
+
+
+def _parse_one(file_path: str, project_id: str) -> ParseResult:
+    """解析单个文件（进程池任务，需为模块级函数以便序列化）
+    
+    只做不依赖上下文管理器状态的纯解析，上下文相关处理由主进程完成。
+    """
+    agent = get_file_parser_agent()
+    if Path(file_path).suffix.lower() == '.srt':
+        return agent.srt_parser.parse_file(file_path)
+    return agent.story_parser.parse_story_document(file_path, project_id)
 
 
+@lru_cache(maxsize=1)
 def get_file_parser_agent() -> FileParserAgent:
-    """获取文件解析Agent实例"""
-    return file_parser_agent
\ No newline at end of file
+    """获取文件解析Agent实例（首次调用时创建）"""
+    return FileParserAgent()
\ No newline at end of file
@@ -1,14 +1,42 @@
 """
 模型容错管理器
 """
+import re
 import time
 import logging
-from typing import Optional, Dict, Any
+import threading
+from functools import lru_cache
+from typing import Optional, Dict, Any, Set
+from botocore.exceptions import ClientError
 from strands.models import BedrockModel
 from config import bedrock_config, get_logger
 
 logger = get_logger("model_manager")
 
+# Bedrock 限流错误码
+THROTTLE_CODES = frozenset({
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "RequestLimitExceeded",
+})
+
+# 非 ClientError 异常时，按错误信息识别限流
+THROTTLE_MESSAGE_PATTERN = re.compile(r'429|throttling|rate limit', re.IGNORECASE)
+
+
+@lru_cache(maxsize=4)
+def _build_model(model_id: str, region: str, max_tokens: int, temperature: float,
+                 memory_enabled: bool, memory_duration_days: int) -> BedrockModel:
+    """按配置创建模型实例（按完整配置缓存，配置变化时不会沿用旧实例）"""
+    return BedrockModel(
+        model_id=model_id,
+        region=region,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        memory_enabled=memory_enabled,
+        memory_duration_days=memory_duration_days,
+    )
+
 
 class ModelFallbackManager:
     """模型容错管理器
@@ -37,12 +65,22 @@ class ModelFallbackManager:
         
         self.retry_attempts = bedrock_config.retry_attempts
         self.backoff_delay = bedrock_config.backoff_delay
+        # 指数退避的重试间隔表（失败次数超过5次后不再增长）
+        self._retry_intervals = tuple(self.backoff_delay * (1 << i) for i in range(6))
         
         # 状态跟踪
         self.current_model_type = "primary"  # primary or fallback
         self.primary_failure_count = 0
-        self.last_failure_time = None
-        self.model_cache: Dict[str, BedrockModel] = {}
+        self.last_failure_time = None  # time.monotonic()，仅用于计算退避间隔
+        self.last_failure_wall = None  # 墙上时间，用于对外展示
+        
+        # 模型实例按需创建、按配置缓存（见 _build_model），初始化时不构建任何 BedrockModel；
+        # 获取模型时按类型加锁，避免并发重复创建同一模型。状态字段共用一把锁
+        self._model_locks = {"primary": threading.Lock(), "fallback": threading.Lock()}
+        self._state_lock = threading.Lock()
+        
+        # 已确认可用的模型类型，观察到失败前不再重复进行可用性检测
+        self._verified: Set[str] = set()
         
         logger.info("模型容错管理器初始化完成", 
                    primary_model=self.primary_config["model_id"],
@@ -54,43 +92,77 @@ class ModelFallbackManager:
         # 首先尝试主模型
         if self.current_model_type == "primary" or self._should_retry_primary():
             try:
-                model = self._get_model("primary")
-                if self._test_model_availability(model):
-                    self.current_model_type = "primary"
-                    self.primary_failure_count = 0
+                model = self.primary_model
+                if self._is_model_available("primary", model):
+                    with self._state_lock:
+                        self.current_model_type = "primary"
+                        self.primary_failure_count = 0
                     logger.info("使用主模型", model_id=self.primary_config["model_id"])
                     return model
             except Exception as e:
                 logger.warning("主模型不可用", error=str(e), model_id=self.primary_config["model_id"])
-                self._handle_primary_failure(e)
+                self.mark_failure("primary", e)
         
         # 使用备用模型
         try:
-            model = self._get_model("fallback")
-            if self._test_model_availability(model):
-                self.current_model_type = "fallback"
+            model = self.fallback_model
+            if self._is_model_available("fallback", model):
+                with self._state_lock:
+                    self.current_model_type = "fallback"
                 logger.info("切换到备用模型", model_id=self.fallback_config["model_id"])
                 return model
         except Exception as e:
             logger.error("备用模型也不可用", error=str(e), model_id=self.fallback_config["model_id"])
+            self.mark_failure("fallback", e)
             raise RuntimeError(f"所有模型都不可用: 主模型和备用模型都失败")
         
         raise RuntimeError("无法获取可用模型")
     
+    @property
+    def primary_model(self) -> BedrockModel:
+        """主模型实例（首次访问时创建）"""
+        return self._get_model("primary")
+    
+    @property
+    def fallback_model(self) -> BedrockModel:
+        """备用模型实例（仅在首次切换到备用模型时创建）"""
+        return self._get_model("fallback")
+    
     def _get_model(self, model_type: str) -> BedrockModel:
         """获取指定类型的模型实例"""
-        if model_type in self.model_cache:
-            return self.model_cache[model_type]
-        
         config = self.primary_config if model_type == "primary" else self.fallback_config
         
-        try:
-            model = BedrockModel(**config)
-            self.model_cache[model_type] = model
-            return model
-        except Exception as e:
-            logger.error(f"创建{model_type}模型失败", error=str(e), config=config)
-            raise
+        with self._model_locks[model_type]:
+            try:
+                return _build_model(**config)
+            except Exception as e:
+                logger.error(f"创建{model_type}模型失败", error=str(e), config=config)
+                raise
+    
+    def _is_model_available(self, model_type: str, model: BedrockModel) -> bool:
+        """判断模型是否可用，已确认可用的模型不再重复检测"""
+        if model_type in self._verified:
+            return True
+        
+        if self._test_model_availability(model):
+            self.mark_success(model_type)
+            return True
+        return False
+    
+    def mark_success(self, model_type: str):
+        """记录模型调用成功（由调用方在请求成功后通知）"""
+        self._verified.add(model_type)
+    
+    def mark_failure(self, model_type: str, error: Exception):
+        """记录模型调用失败（由调用方在请求失败后通知），该模型下次获取时重新检测
+        
+        主模型失败同时计入失败次数并开始退避，期间改用备用模型
+        """
+        if model_type == "primary":
+            self._handle_primary_failure(error)
+        else:
+            self._verified.discard(model_type)
+            logger.warning(f"{model_type}模型调用失败", error=str(error))
     
     def _test_model_availability(self, model: BedrockModel) -> bool:
         """测试模型可用性"""
@@ -107,27 +179,44 @@ class ModelFallbackManager:
     
     def _handle_primary_failure(self, error: Exception):
         """处理主模型失败"""
-        self.primary_failure_count += 1
-        self.last_failure_time = time.time()
+        with self._state_lock:
+            self.primary_failure_count += 1
+            self.last_failure_time = time.monotonic()
+            self.last_failure_wall = time.time()
+            failure_count = self.primary_failure_count
+        self._verified.discard("primary")
         
         # 检查是否是限流错误
-        error_str = str(error).lower()
-        if "429" in error_str or "throttling" in error_str or "rate limit" in error_str:
+        if self._is_throttling_error(error):
             logger.warning("检测到限流错误，切换到备用模型", 
-                         failure_count=self.primary_failure_count)
+                         failure_count=failure_count)
         else:
             logger.error("主模型调用失败", 
                         error=str(error), 
-                        failure_count=self.primary_failure_count)
+                        failure_count=failure_count)
+    
+    def _is_throttling_error(self, error: Exception) -> bool:
+        """判断是否为限流错误：ClientError 直接看错误码，其他异常再匹配错误信息"""
+        if isinstance(error, ClientError):
+            response = error.response
+            return (
+                response.get("Error", {}).get("Code") in THROTTLE_CODES
+                or response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 429
+            )
+        return THROTTLE_MESSAGE_PATTERN.search(str(error)) is not None
     
     def _should_retry_primary(self) -> bool:
         """判断是否应该重试主模型"""
-        if self.last_failure_time is None:
+        with self._state_lock:
+            last_failure_time = self.last_failure_time
+            failure_count = self.primary_failure_count
+        
+        if last_failure_time is None:
             return True
         
         # 如果距离上次失败超过一定时间，尝试重新使用主模型
-        time_since_failure = time.time() - self.last_failure_time
-        retry_interval = self.backoff_delay * (2 ** min(self.primary_failure_count, 5))  # 指数退避
+        time_since_failure = time.monotonic() - last_failure_time
+        retry_interval = self._retry_intervals[min(failure_count, 5)]  # 指数退避
         
         should_retry = time_since_failure > retry_interval
         if should_retry:
@@ -139,44 +228,69 @@ class ModelFallbackManager:
     
     def get_current_model_info(self) -> Dict[str, Any]:
         """获取当前模型信息"""
-        config = self.primary_config if self.current_model_type == "primary" else self.fallback_config
+        with self._state_lock:
+            model_type = self.current_model_type
+            failure_count = self.primary_failure_count
+            last_failure_wall = self.last_failure_wall
+        
+        config = self.primary_config if model_type == "primary" else self.fallback_config
         return {
-            "model_type": self.current_model_type,
+            "model_type": model_type,
             "model_id": config["model_id"],
             "region": config["region"],
-            "primary_failure_count": self.primary_failure_count,
-            "last_failure_time": self.last_failure_time,
+            "primary_failure_count": failure_count,
+            "last_failure_time": last_failure_wall,
         }
     
     def reset_failure_state(self):
         """重置失败状态"""
-        self.primary_failure_count = 0
-        self.last_failure_time = None
-        self.current_model_type = "primary"
+        with self._state_lock:
+            self.primary_failure_count = 0
+            self.last_failure_time = None
+            self.last_failure_wall = None
+            self.current_model_type = "primary"
+        # 同时丢弃已创建的模型实例，下次使用时按当前配置重新创建并检测
+        _build_model.cache_clear()
+        self._verified.clear()
         logger.info("重置模型失败状态")
     
     def force_fallback(self):
         """强制使用备用模型"""
-        self.current_model_type = "fallback"
+        with self._state_lock:
+            self.current_model_type = "fallback"
         logger.info("强制切换到备用模型")
     
     def force_primary(self):
         """强制使用主模型"""
-        self.current_model_type = "primary"
-        self.primary_failure_count = 0
-        self.last_failure_time = None
+        with self._state_lock:
+            self.current_model_type = "primary"
+            self.primary_failure_count = 0
+            self.last_failure_time = None
+            self.last_failure_wall = None
         logger.info("强制切换到主模型")
 
 
-# 全局模型管理器实例
-model_manager = ModelFallbackManager()
+@lru_cache(maxsize=1)
+def get_model_manager() -> ModelFallbackManager:
+    """获取全局模型管理器实例（首次调用时创建）"""
+    return ModelFallbackManager()
 
 
 def get_model():
     """获取可用模型的便捷函数"""
-    return model_manager.get_model_with_fallback()
+    return get_model_manager().get_model_with_fallback()
 
 
 def get_model_info():
     """获取当前模型信息的便捷函数"""
-    return model_manager.get_current_model_info()
\ No newline at end of file
+    return get_model_manager().get_current_model_info()
+
+
+def mark_model_success(model_type: str):
+    """上报模型调用成功的便捷函数"""
+    get_model_manager().mark_success(model_type)
+
+
+def mark_model_failure(model_type: str, error: Exception):
+    """上报模型调用失败的便捷函数"""
+    get_model_manager().mark_failure(model_type, error)
\ No newline at end of file
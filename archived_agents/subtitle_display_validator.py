@@ -4,22 +4,58 @@
 实现字幕时长、字符数、重叠检测、格式验证等功能
 """
 import re
+import logging
+import time
 import uuid
 import json
-from typing import Dict, List, Optional, Any, Tuple
+import asyncio
+import copy
+from itertools import chain
+from typing import Dict, List, Mapping, Optional, Any, Tuple
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from enum import Enum
-from collections import defaultdict
+from types import MappingProxyType
+from collections import OrderedDict, defaultdict
 
-from config import get_logger
-from models.subtitle_models import SubtitleEntry
+from config import get_logger, is_log_enabled
+from models.subtitle_models import SubtitleEntry, TimeCode
+from models.dataclass_options import SLOTS_DATACLASS_OPTIONS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 logger = get_logger("subtitle_display_validator")
 
+# 字幕条数达到该值时，整个验证过程交给线程池执行一次，避免长时间占用事件循环
+# （各验证器都是纯 Python 计算，拆到多个线程并发只会争抢 GIL，因此不再分开提交）
+OFFLOAD_VALIDATION_MIN_SUBTITLES = 500
+
+# 验证计划缓存上限（按 目标语言 + 启用规则 组合缓存，LRU 淘汰）
+VALIDATION_PLAN_CACHE_SIZE = 32
+
+# 需要用到时长/文本长度列的规则
+COLUMN_RULE_IDS = frozenset({"min_duration", "max_chars_per_line", "reading_speed"})
+
+
+def _shift_time(value: Any, seconds: float) -> Any:
+    """将字幕时间平移指定秒数：TimeCode 按毫秒取整后生成新时间码，数值直接相加"""
+    if isinstance(value, TimeCode):
+        return TimeCode.from_milliseconds(value.to_milliseconds() + round(seconds * 1000))
+    return value + seconds
+
+
+def _time_diff_ms(later: Any, earlier: Any) -> float:
+    """计算两个字幕时间的差值（毫秒）：TimeCode 按总毫秒数相减，数值按秒处理"""
+    if hasattr(later, "to_milliseconds") and hasattr(earlier, "to_milliseconds"):
+        return later.to_milliseconds() - earlier.to_milliseconds()
+    return (later - earlier) * 1000
+
 
 class ValidationSeverity(Enum):
-    """验证问题严重程度"""
+    """验证问题严重程度（level 越小越严重）"""
     CRITICAL = "critical"
     HIGH = "high"
     MEDIUM = "medium"
@@ -27,6 +63,12 @@ class ValidationSeverity(Enum):
     INFO = "info"
 
 
+# 严重程度对应的整数等级（按定义顺序 CRITICAL=0 ... INFO=4），与修复阈值比较时直接比整数
+_SEVERITY_LEVEL: Mapping[ValidationSeverity, int] = MappingProxyType(
+    {severity: level for level, severity in enumerate(ValidationSeverity)}
+)
+
+
 class ValidationType(Enum):
     """验证类型"""
     DURATION = "duration"
@@ -47,7 +89,7 @@ class FixStrategy(Enum):
     IGNORE = "ignore"
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ValidationRule:
     """验证规则"""
     rule_id: str
@@ -64,7 +106,7 @@ class ValidationRule:
             self.parameters = {}
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ValidationIssue:
     """验证问题"""
     issue_id: str
@@ -87,7 +129,7 @@ class ValidationIssue:
             self.detected_at = datetime.now()
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ValidationRequest:
     """验证请求"""
     request_id: str
@@ -108,7 +150,7 @@ class ValidationRequest:
             self.validation_rules = []
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ValidationResult:
     """验证结果"""
     request_id: str
@@ -139,14 +181,115 @@ class ValidationResult:
             self.timestamp = datetime.now()
 
 
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
+class ValidationPlan:
+    """验证计划：某一目标语言和启用规则组合下预先整理好的验证参数"""
+    lang_config: Mapping[str, Any]
+    rules_by_id: Dict[str, ValidationRule]
+    needs_columns: bool = False
+
+
+# 各语言的字幕显示标准（只读，所有验证器实例共用）
+LANGUAGE_CONFIGS: Mapping[str, Mapping[str, Any]] = MappingProxyType({
+    "en": MappingProxyType({
+        "max_chars_per_line": 42,
+        "max_lines": 2,
+        "min_duration_ms": 1000,
+        "max_duration_ms": 7000,
+        "reading_speed_cps": 17,
+        "min_gap_ms": 250,
+        "max_chars_total": 84
+    }),
+    "zh": MappingProxyType({
+        "max_chars_per_line": 20,
+        "max_lines": 2,
+        "min_duration_ms": 1000,
+        "max_duration_ms": 6000,
+        "reading_speed_cps": 8,
+        "min_gap_ms": 250,
+        "max_chars_total": 40
+    }),
+    "ja": MappingProxyType({
+        "max_chars_per_line": 18,
+        "max_lines": 2,
+        "min_duration_ms": 1200,
+        "max_duration_ms": 6000,
+        "reading_speed_cps": 9,
+        "min_gap_ms": 300,
+        "max_chars_total": 36
+    })
+})
+
+# 内置验证规则模板（模块加载时创建一次，各验证器实例初始化时复制一份使用）
+BUILT_IN_RULES: Tuple[ValidationRule, ...] = (
+    ValidationRule(
+        rule_id="min_duration",
+        rule_name="最小显示时长",
+        validation_type=ValidationType.DURATION,
+        severity=ValidationSeverity.HIGH,
+        fix_strategy=FixStrategy.AUTO_FIX,
+        description="检查字幕显示时长是否达到最小要求",
+        parameters={"min_duration_ms": 1000}
+    ),
+    ValidationRule(
+        rule_id="max_chars_per_line",
+        rule_name="每行最大字符数",
+        validation_type=ValidationType.CHARACTER_COUNT,
+        severity=ValidationSeverity.HIGH,
+        fix_strategy=FixStrategy.AUTO_FIX,
+        description="检查每行字符数是否超过限制",
+        parameters={"max_chars": 42}
+    ),
+    ValidationRule(
+        rule_id="overlap_detection",
+        rule_name="字幕重叠检测",
+        validation_type=ValidationType.OVERLAP,
+        severity=ValidationSeverity.CRITICAL,
+        fix_strategy=FixStrategy.AUTO_FIX,
+        description="检测字幕时间重叠问题"
+    ),
+    ValidationRule(
+        rule_id="min_gap",
+        rule_name="最小字幕间隔",
+        validation_type=ValidationType.GAP,
+        severity=ValidationSeverity.LOW,
+        fix_strategy=FixStrategy.SUGGEST_FIX,
+        description="检查相邻字幕之间的间隔是否过短",
+        parameters={"min_gap_ms": 250}
+    ),
+    ValidationRule(
+        rule_id="text_format",
+        rule_name="文本格式",
+        validation_type=ValidationType.FORMAT,
+        severity=ValidationSeverity.MEDIUM,
+        fix_strategy=FixStrategy.AUTO_FIX,
+        description="检查文本格式问题"
+    ),
+    ValidationRule(
+        rule_id="reading_speed",
+        rule_name="阅读速度",
+        validation_type=ValidationType.READING_SPEED,
+        severity=ValidationSeverity.HIGH,
+        fix_strategy=FixStrategy.AUTO_FIX,
+        description="检查字幕阅读速度是否合理",
+        parameters={"max_cps": 20}
+    ),
+)
+
+
 class SubtitleDisplayValidator:
     """字幕显示验证器"""
     
     def __init__(self, validator_id: str = None):
         self.validator_id = validator_id or f"display_validator_{uuid.uuid4().hex[:8]}"
-        self.language_configs = self._initialize_language_configs()
-        self.built_in_rules = self._initialize_built_in_rules()
+        self.language_configs = LANGUAGE_CONFIGS
+        # 每个实例复制一份内置规则（连同参数字典），修改规则不会影响其他实例
+        self.built_in_rules = [replace(rule, parameters=dict(rule.parameters)) for rule in BUILT_IN_RULES]
         self.custom_rules: List[ValidationRule] = []
+        # 自动修复时用于合并空白的正则，初始化时编译一次
+        self._ws_re = re.compile(r'\s+')
+        # 验证计划缓存 (LRU)
+        self._plan_cache: "OrderedDict[Tuple[str, Tuple[Tuple[Any, ...], ...]], ValidationPlan]" = OrderedDict()
         self.validation_stats = {
             "total_validations": 0,
             "issues_found": 0,
@@ -157,108 +300,27 @@ class SubtitleDisplayValidator:
         }
         logger.info("字幕显示验证器初始化完成", validator_id=self.validator_id)
     
-    def _initialize_language_configs(self) -> Dict[str, Dict[str, Any]]:
-        """初始化语言配置"""
-        return {
-            "en": {
-                "max_chars_per_line": 42,
-                "max_lines": 2,
-                "min_duration_ms": 1000,
-                "max_duration_ms": 7000,
-                "reading_speed_cps": 17,
-                "min_gap_ms": 250,
-                "max_chars_total": 84
-            },
-            "zh": {
-                "max_chars_per_line": 20,
-                "max_lines": 2,
-                "min_duration_ms": 1000,
-                "max_duration_ms": 6000,
-                "reading_speed_cps": 8,
-                "min_gap_ms": 250,
-                "max_chars_total": 40
-            },
-            "ja": {
-                "max_chars_per_line": 18,
-                "max_lines": 2,
-                "min_duration_ms": 1200,
-                "max_duration_ms": 6000,
-                "reading_speed_cps": 9,
-                "min_gap_ms": 300,
-                "max_chars_total": 36
-            }
-        }
-    
-    def _initialize_built_in_rules(self) -> List[ValidationRule]:
-        """初始化内置验证规则"""
-        return [
-            ValidationRule(
-                rule_id="min_duration",
-                rule_name="最小显示时长",
-                validation_type=ValidationType.DURATION,
-                severity=ValidationSeverity.HIGH,
-                fix_strategy=FixStrategy.AUTO_FIX,
-                description="检查字幕显示时长是否达到最小要求",
-                parameters={"min_duration_ms": 1000}
-            ),
-            ValidationRule(
-                rule_id="max_chars_per_line",
-                rule_name="每行最大字符数",
-                validation_type=ValidationType.CHARACTER_COUNT,
-                severity=ValidationSeverity.HIGH,
-                fix_strategy=FixStrategy.AUTO_FIX,
-                description="检查每行字符数是否超过限制",
-                parameters={"max_chars": 42}
-            ),
-            ValidationRule(
-                rule_id="overlap_detection",
-                rule_name="字幕重叠检测",
-                validation_type=ValidationType.OVERLAP,
-                severity=ValidationSeverity.CRITICAL,
-                fix_strategy=FixStrategy.AUTO_FIX,
-                description="检测字幕时间重叠问题"
-            ),
-            ValidationRule(
-                rule_id="text_format",
-                rule_name="文本格式",
-                validation_type=ValidationType.FORMAT,
-                severity=ValidationSeverity.MEDIUM,
-                fix_strategy=FixStrategy.AUTO_FIX,
-                description="检查文本格式问题"
-            ),
-            ValidationRule(
-                rule_id="reading_speed",
-                rule_name="阅读速度",
-                validation_type=ValidationType.READING_SPEED,
-                severity=ValidationSeverity.HIGH,
-                fix_strategy=FixStrategy.AUTO_FIX,
-                description="检查字幕阅读速度是否合理",
-                parameters={"max_cps": 20}
-            )
-        ]
-
     async def validate_subtitles(self, request: ValidationRequest) -> ValidationResult:
         """验证字幕"""
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
         
-        logger.info("开始字幕显示验证",
-                   request_id=request.request_id,
-                   subtitles_count=len(request.subtitle_entries),
-                   target_language=request.target_language)
+        if is_log_enabled("subtitle_display_validator", logging.INFO):
+            logger.info("开始字幕显示验证",
+                       request_id=request.request_id,
+                       subtitles_count=len(request.subtitle_entries),
+                       target_language=request.target_language)
         
         try:
             all_rules = self.built_in_rules + self.custom_rules + (request.validation_rules or [])
             enabled_rules = [rule for rule in all_rules if rule.enabled]
-            lang_config = self.language_configs.get(request.target_language, self.language_configs["en"])
+            plan = self._get_validation_plan(request.target_language, enabled_rules)
             
-            issues = []
-            
-            # 执行各种验证
-            issues.extend(self._validate_duration_and_characters(request.subtitle_entries, enabled_rules, lang_config))
-            issues.extend(self._validate_overlaps_and_gaps(request.subtitle_entries, enabled_rules, lang_config))
-            issues.extend(self._validate_format(request.subtitle_entries, enabled_rules))
-            issues.extend(self._validate_reading_speed(request.subtitle_entries, enabled_rules, lang_config))
-            issues.extend(self._validate_timing_sequence(request.subtitle_entries, enabled_rules))
+            subtitles = request.subtitle_entries
+            if len(subtitles) >= OFFLOAD_VALIDATION_MIN_SUBTITLES:
+                loop = asyncio.get_running_loop()
+                issues = await loop.run_in_executor(None, self._run_validators, subtitles, plan)
+            else:
+                issues = self._run_validators(subtitles, plan)
             
             # 自动修复
             fixed_issues = []
@@ -269,11 +331,10 @@ class SubtitleDisplayValidator:
                 )
             
             validation_score = self._calculate_validation_score(issues, len(request.subtitle_entries))
-            issues_by_type = self._count_issues_by_type(issues)
-            issues_by_severity = self._count_issues_by_severity(issues)
+            issues_by_type, issues_by_severity = self._count_issues(issues)
             recommendations = self._generate_recommendations(issues)
             
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            processing_time = (time.perf_counter_ns() - start_ns) / 1_000_000
             
             result = ValidationResult(
                 request_id=request.request_id,
@@ -295,16 +356,17 @@ class SubtitleDisplayValidator:
             
             self._update_validation_stats(request, result)
             
-            logger.info("字幕显示验证完成",
-                       request_id=request.request_id,
-                       validation_score=validation_score,
-                       issues_count=len(issues),
-                       processing_time_ms=int(processing_time))
+            if is_log_enabled("subtitle_display_validator", logging.INFO):
+                logger.info("字幕显示验证完成",
+                           request_id=request.request_id,
+                           validation_score=validation_score,
+                           issues_count=len(issues),
+                           processing_time_ms=int(processing_time))
             
             return result
             
         except Exception as e:
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            processing_time = (time.perf_counter_ns() - start_ns) / 1_000_000
             
             logger.error("字幕显示验证失败",
                         request_id=request.request_id,
@@ -320,20 +382,95 @@ class SubtitleDisplayValidator:
                 recommendations=[f"验证过程中发生错误: {str(e)}"]
             )
 
+    def _run_validators(self, subtitles: List[SubtitleEntry], plan: ValidationPlan) -> List[ValidationIssue]:
+        """按验证计划依次执行各项验证，结果按固定顺序合并"""
+        rules_by_id = plan.rules_by_id
+        lang_config = plan.lang_config
+        # 本次验证发现的问题共用同一个检测时间
+        detected_at = datetime.now()
+        # 时长、文本长度列只提取一次，供时长/字符数和阅读速度两项检查共用（都未启用时不提取）
+        columns = self._extract_columns(subtitles) if plan.needs_columns else None
+        
+        return list(chain(
+            self._validate_duration_and_characters(subtitles, rules_by_id, lang_config, detected_at, columns),
+            self._validate_overlaps_and_gaps(subtitles, rules_by_id, lang_config, detected_at),
+            self._validate_format(subtitles, rules_by_id, detected_at),
+            self._validate_reading_speed(subtitles, rules_by_id, lang_config, detected_at, columns),
+            self._validate_timing_sequence(subtitles, rules_by_id, detected_at),
+        ))
+    
+    def _get_validation_plan(self, language: str, enabled_rules: List[ValidationRule]) -> ValidationPlan:
+        """获取验证计划，相同语言和启用规则组合直接复用缓存"""
+        # 以规则内容作键：各验证器只用到规则的 ID、严重程度和修复策略
+        cache_key = (language, tuple((rule.rule_id, rule.severity, rule.fix_strategy) for rule in enabled_rules))
+        plan = self._plan_cache.get(cache_key)
+        if plan is not None:
+            self._plan_cache.move_to_end(cache_key)
+            return plan
+        
+        # 按规则ID建立索引（同ID取第一条，与原先的顺序查找一致），各验证器O(1)查找；
+        # 计划保存规则副本，之后修改原规则不会影响已缓存的计划
+        rules_by_id: Dict[str, ValidationRule] = {}
+        for rule in enabled_rules:
+            if rule.rule_id not in rules_by_id:
+                rules_by_id[rule.rule_id] = replace(rule, parameters=dict(rule.parameters))
+        
+        plan = ValidationPlan(
+            lang_config=self.language_configs.get(language, self.language_configs["en"]),
+            rules_by_id=rules_by_id,
+            needs_columns=not COLUMN_RULE_IDS.isdisjoint(rules_by_id),
+        )
+        self._plan_cache[cache_key] = plan
+        if len(self._plan_cache) > VALIDATION_PLAN_CACHE_SIZE:
+            self._plan_cache.popitem(last=False)
+        return plan
+    
+    def _extract_columns(self, subtitles: List[SubtitleEntry]) -> Optional[Tuple[Any, Any]]:
+        """按列提取显示时长（秒）和文本长度，未安装 NumPy 或没有字幕时返回 None"""
+        if np is None or not subtitles:
+            return None
+        
+        count = len(subtitles)
+        durations = np.fromiter((subtitle.duration_seconds for subtitle in subtitles),
+                                dtype=np.float64, count=count)
+        text_lengths = np.fromiter((len(subtitle.text) for subtitle in subtitles),
+                                   dtype=np.float64, count=count)
+        return durations, text_lengths
+    
     def _validate_duration_and_characters(self, subtitles: List[SubtitleEntry], 
-                                         rules: List[ValidationRule],
-                                         lang_config: Dict[str, Any]) -> List[ValidationIssue]:
+                                         rules_by_id: Dict[str, ValidationRule],
+                                         lang_config: Dict[str, Any],
+                                         detected_at: datetime,
+                                         columns: Optional[Tuple[Any, Any]] = None) -> List[ValidationIssue]:
         """验证时长和字符数"""
         issues = []
         
-        for i, subtitle in enumerate(subtitles):
-            duration_ms = subtitle.duration_seconds * 1000
-            lines = subtitle.text.split('\n')
+        # 传入的规则均已启用
+        min_duration_rule = rules_by_id.get("min_duration")
+        max_chars_rule = rules_by_id.get("max_chars_per_line")
+        if not min_duration_rule and not max_chars_rule:
+            return issues
+        
+        min_duration = lang_config.get("min_duration_ms", 1000)
+        max_chars = lang_config.get("max_chars_per_line", 42)
+        
+        indices = range(len(subtitles))
+        if columns is not None:
+            # 向量化筛出可能违规的条目（整段文本不超长则每行都不超长），只对这些条目逐条检查
+            durations, text_lengths = columns
+            mask = np.zeros(len(durations), dtype=bool)
+            if min_duration_rule:
+                mask |= durations * 1000 < min_duration
+            if max_chars_rule:
+                mask |= text_lengths > max_chars
+            indices = np.flatnonzero(mask).tolist()
+        
+        for i in indices:
+            subtitle = subtitles[i]
             
-            # 检查最小时长
-            min_duration_rule = next((r for r in rules if r.rule_id == "min_duration"), None)
-            if min_duration_rule and min_duration_rule.enabled:
-                min_duration = lang_config.get("min_duration_ms", 1000)
+            # 检查最小时长（duration_seconds 为 SubtitleEntry 构造时算好的字段，直接读取）
+            if min_duration_rule:
+                duration_ms = subtitle.duration_seconds * 1000
                 if duration_ms < min_duration:
                     issues.append(ValidationIssue(
                         issue_id=f"min_duration_{i}",
@@ -348,13 +485,14 @@ class SubtitleDisplayValidator:
                         },
                         suggested_fix=f"建议延长显示时间至 {min_duration}ms",
                         fix_strategy=min_duration_rule.fix_strategy,
-                        can_auto_fix=True
+                        can_auto_fix=True,
+                        detected_at=detected_at
                     ))
             
-            # 检查每行字符数
-            max_chars_rule = next((r for r in rules if r.rule_id == "max_chars_per_line"), None)
-            if max_chars_rule and max_chars_rule.enabled:
-                max_chars = lang_config.get("max_chars_per_line", 42)
+            # 检查每行字符数（整段文本不超长时无需逐行检查；单行字幕不必分割）
+            text = subtitle.text
+            if max_chars_rule and len(text) > max_chars:
+                lines = text.split('\n') if '\n' in text else (text,)
                 for line_idx, line in enumerate(lines):
                     if len(line) > max_chars:
                         issues.append(ValidationIssue(
@@ -371,57 +509,119 @@ class SubtitleDisplayValidator:
                             },
                             suggested_fix=f"建议将该行分割或缩短至 {max_chars} 字符以内",
                             fix_strategy=max_chars_rule.fix_strategy,
-                            can_auto_fix=True
+                            can_auto_fix=True,
+                            detected_at=detected_at
                         ))
         
         return issues
 
     def _validate_overlaps_and_gaps(self, subtitles: List[SubtitleEntry],
-                                   rules: List[ValidationRule],
-                                   lang_config: Dict[str, Any]) -> List[ValidationIssue]:
+                                   rules_by_id: Dict[str, ValidationRule],
+                                   lang_config: Dict[str, Any],
+                                   detected_at: datetime) -> List[ValidationIssue]:
         """验证重叠和间隔"""
         issues = []
         
         if len(subtitles) < 2:
             return issues
         
-        overlap_rule = next((r for r in rules if r.rule_id == "overlap_detection"), None)
+        overlap_rule = rules_by_id.get("overlap_detection")
+        gap_rule = rules_by_id.get("min_gap")
+        if not overlap_rule and not gap_rule:
+            return issues
+        
+        min_gap = lang_config.get("min_gap_ms", 250)
+        overlap_pairs, gap_pairs = self._scan_intervals(subtitles, min_gap if gap_rule else None)
         
-        for i in range(len(subtitles) - 1):
-            current = subtitles[i]
-            next_subtitle = subtitles[i + 1]
-            
-            # 检查重叠
-            if overlap_rule and overlap_rule.enabled:
-                if current.end_time > next_subtitle.start_time:
-                    overlap_ms = (current.end_time - next_subtitle.start_time) * 1000
-                    issues.append(ValidationIssue(
-                        issue_id=f"overlap_{i}_{i+1}",
-                        rule_id=overlap_rule.rule_id,
-                        validation_type=ValidationType.OVERLAP,
-                        severity=overlap_rule.severity,
-                        subtitle_index=i,
-                        message=f"字幕重叠: 第{i+1}条与第{i+2}条重叠 {overlap_ms:.0f}ms",
-                        details={
-                            "current_end": current.end_time,
-                            "next_start": next_subtitle.start_time,
-                            "overlap_ms": overlap_ms,
-                            "next_index": i + 1
-                        },
-                        suggested_fix=f"建议调整第{i+1}条结束时间至 {next_subtitle.start_time}s",
-                        fix_strategy=overlap_rule.fix_strategy,
-                        can_auto_fix=True
-                    ))
+        # 检查重叠（i 为开始较早的一条，j 为与其重叠的后一条）
+        if overlap_rule:
+            for i, j in overlap_pairs:
+                current = subtitles[i]
+                next_subtitle = subtitles[j]
+                overlap_ms = _time_diff_ms(current.end_time, next_subtitle.start_time)
+                issues.append(ValidationIssue(
+                    issue_id=f"overlap_{i}_{j}",
+                    rule_id=overlap_rule.rule_id,
+                    validation_type=ValidationType.OVERLAP,
+                    severity=overlap_rule.severity,
+                    subtitle_index=i,
+                    message=f"字幕重叠: 第{i+1}条与第{j+1}条重叠 {overlap_ms:.0f}ms",
+                    details={
+                        "current_end": current.end_time,
+                        "next_start": next_subtitle.start_time,
+                        "overlap_ms": overlap_ms,
+                        "next_index": j
+                    },
+                    suggested_fix=f"建议调整第{i+1}条结束时间至 {next_subtitle.start_time}s",
+                    fix_strategy=overlap_rule.fix_strategy,
+                    can_auto_fix=True,
+                    detected_at=detected_at
+                ))
+        
+        # 检查间隔（按时间先后相邻、不重叠但间隔不足）
+        for i, j in gap_pairs:
+            gap_ms = _time_diff_ms(subtitles[j].start_time, subtitles[i].end_time)
+            issues.append(ValidationIssue(
+                issue_id=f"min_gap_{i}_{j}",
+                rule_id=gap_rule.rule_id,
+                validation_type=ValidationType.GAP,
+                severity=gap_rule.severity,
+                subtitle_index=i,
+                message=f"字幕间隔过短: 第{i+1}条与第{j+1}条间隔 {gap_ms:.0f}ms < {min_gap}ms",
+                details={
+                    "gap_ms": gap_ms,
+                    "min_gap_ms": min_gap,
+                    "next_index": j
+                },
+                suggested_fix=f"建议将两条字幕的间隔调整至 {min_gap}ms 以上",
+                fix_strategy=gap_rule.fix_strategy,
+                can_auto_fix=False,
+                detected_at=detected_at
+            ))
         
         return issues
+    
+    @staticmethod
+    def _scan_intervals(subtitles: List[SubtitleEntry],
+                        min_gap_ms: Optional[float] = None) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+        """按开始时间排序后扫描一遍，同时找出重叠的字幕对和间隔过短的字幕对
+        
+        重叠对 (i, j)：第 i 条开始得更早（同时开始时 i 在前）且结束晚于第 j 条开始。扫描时
+        只保留结束时间晚于当前开始时间的字幕，复杂度 O(N log N + K)（K 为重叠对数），
+        不依赖输入顺序，也能发现不相邻的重叠。
+        间隔对 (i, j)：按时间先后相邻、不重叠但间隔小于 min_gap_ms，为 None 时不检查
+        """
+        # (开始时间, 下标, 结束时间)，下标唯一，排序时不会比较到结束时间
+        timeline = sorted((subtitle.start_time, index, subtitle.end_time)
+                          for index, subtitle in enumerate(subtitles))
+        overlap_pairs = []
+        gap_pairs = []
+        active: List[Tuple[Any, int]] = []  # (结束时间, 下标)
+        previous = None
+        
+        for start, j, end in timeline:
+            active = [item for item in active if item[0] > start]
+            overlap_pairs.extend((i, j) for _, i in active)
+            
+            if min_gap_ms is not None and previous is not None:
+                previous_end, i = previous
+                if previous_end <= start and _time_diff_ms(start, previous_end) < min_gap_ms:
+                    gap_pairs.append((i, j))
+            
+            active.append((end, j))
+            previous = (end, j)
+        
+        overlap_pairs.sort()
+        return overlap_pairs, gap_pairs
 
     def _validate_format(self, subtitles: List[SubtitleEntry],
-                        rules: List[ValidationRule]) -> List[ValidationIssue]:
+                        rules_by_id: Dict[str, ValidationRule],
+                        detected_at: datetime) -> List[ValidationIssue]:
         """验证格式"""
         issues = []
         
-        format_rule = next((r for r in rules if r.rule_id == "text_format"), None)
-        if not format_rule or not format_rule.enabled:
+        format_rule = rules_by_id.get("text_format")
+        if not format_rule:
             return issues
         
         for i, subtitle in enumerate(subtitles):
@@ -439,7 +639,8 @@ class SubtitleDisplayValidator:
                     details={"text": text},
                     suggested_fix="建议清理多余的空格",
                     fix_strategy=FixStrategy.AUTO_FIX,
-                    can_auto_fix=True
+                    can_auto_fix=True,
+                    detected_at=detected_at
                 ))
             
             # 检查开头或结尾的空格
@@ -454,24 +655,36 @@ class SubtitleDisplayValidator:
                     details={"text": text},
                     suggested_fix="建议去除开头和结尾的空格",
                     fix_strategy=FixStrategy.AUTO_FIX,
-                    can_auto_fix=True
+                    can_auto_fix=True,
+                    detected_at=detected_at
                 ))
         
         return issues
 
     def _validate_reading_speed(self, subtitles: List[SubtitleEntry],
-                               rules: List[ValidationRule],
-                               lang_config: Dict[str, Any]) -> List[ValidationIssue]:
+                               rules_by_id: Dict[str, ValidationRule],
+                               lang_config: Dict[str, Any],
+                               detected_at: datetime,
+                               columns: Optional[Tuple[Any, Any]] = None) -> List[ValidationIssue]:
         """验证阅读速度"""
         issues = []
         
-        reading_rule = next((r for r in rules if r.rule_id == "reading_speed"), None)
-        if not reading_rule or not reading_rule.enabled:
+        reading_rule = rules_by_id.get("reading_speed")
+        if not reading_rule:
             return issues
         
         max_cps = lang_config.get("reading_speed_cps", 17)
         
-        for i, subtitle in enumerate(subtitles):
+        indices = range(len(subtitles))
+        if columns is not None:
+            # 按整段文本长度（不小于去掉换行后的长度）向量化预筛，只对可能超速的条目逐条检查
+            durations, text_lengths = columns
+            positive = durations > 0
+            reading_speeds = text_lengths / np.where(positive, durations, np.inf)
+            indices = np.flatnonzero(positive & (reading_speeds > max_cps)).tolist()
+        
+        for i in indices:
+            subtitle = subtitles[i]
             text_length = len(subtitle.text.replace("\n", ""))
             duration_seconds = subtitle.duration_seconds
             
@@ -494,13 +707,15 @@ class SubtitleDisplayValidator:
                         },
                         suggested_fix=f"建议延长显示时间至 {text_length / max_cps:.1f}秒",
                         fix_strategy=reading_rule.fix_strategy,
-                        can_auto_fix=True
+                        can_auto_fix=True,
+                        detected_at=detected_at
                     ))
         
         return issues
 
     def _validate_timing_sequence(self, subtitles: List[SubtitleEntry],
-                                 rules: List[ValidationRule]) -> List[ValidationIssue]:
+                                 rules_by_id: Dict[str, ValidationRule],
+                                 detected_at: datetime) -> List[ValidationIssue]:
         """验证时间序列"""
         issues = []
         
@@ -520,7 +735,8 @@ class SubtitleDisplayValidator:
                     },
                     suggested_fix="建议检查并修正时间设置",
                     fix_strategy=FixStrategy.MANUAL_REVIEW,
-                    can_auto_fix=False
+                    can_auto_fix=False,
+                    detected_at=detected_at
                 ))
         
         return issues
@@ -529,63 +745,69 @@ class SubtitleDisplayValidator:
                               issues: List[ValidationIssue],
                               fix_threshold: ValidationSeverity) -> Tuple[List[SubtitleEntry], List[ValidationIssue]]:
         """自动修复问题"""
-        fixed_subtitles = [subtitle.copy() for subtitle in subtitles]
-        fixed_issues = []
-        
-        severity_order = {
-            ValidationSeverity.CRITICAL: 0,
-            ValidationSeverity.HIGH: 1,
-            ValidationSeverity.MEDIUM: 2,
-            ValidationSeverity.LOW: 3,
-            ValidationSeverity.INFO: 4
-        }
-        
+        threshold_level = _SEVERITY_LEVEL[fix_threshold]
         fixable_issues = [
             issue for issue in issues 
-            if issue.can_auto_fix and severity_order.get(issue.severity, 4) <= severity_order.get(fix_threshold, 4)
+            if issue.can_auto_fix and _SEVERITY_LEVEL[issue.severity] <= threshold_level
         ]
+        # 没有可自动修复的问题时直接返回，不做任何修复准备
+        if not fixable_issues:
+            return list(subtitles), []
+        
+        # 写时复制：只有被修复的字幕才会复制，未改动的条目直接沿用原对象
+        modified: Dict[int, SubtitleEntry] = {}
+        fixed_issues = []
         
         for issue in fixable_issues:
             try:
-                if self._apply_fix(fixed_subtitles, issue):
+                if self._apply_fix(subtitles, modified, issue):
                     fixed_issues.append(issue)
             except Exception as e:
-                logger.warning("自动修复失败", issue_id=issue.issue_id, error=str(e))
+                if is_log_enabled("subtitle_display_validator", logging.WARNING):
+                    logger.warning("自动修复失败", issue_id=issue.issue_id, error=str(e))
         
+        fixed_subtitles = list(subtitles)
+        for index, subtitle in modified.items():
+            fixed_subtitles[index] = subtitle
         return fixed_subtitles, fixed_issues
 
-    def _apply_fix(self, subtitles: List[SubtitleEntry], issue: ValidationIssue) -> bool:
-        """应用修复"""
-        if issue.subtitle_index >= len(subtitles):
+    def _apply_fix(self, subtitles: List[SubtitleEntry], modified: Dict[int, SubtitleEntry],
+                   issue: ValidationIssue) -> bool:
+        """应用修复（首次修改某条字幕时复制，副本记录在 modified 中）"""
+        index = issue.subtitle_index
+        if index >= len(subtitles):
             return False
         
-        subtitle = subtitles[issue.subtitle_index]
+        subtitle = modified.get(index)
+        if subtitle is None:
+            subtitle = modified[index] = copy.copy(subtitles[index])
         
         try:
             if issue.validation_type == ValidationType.DURATION:
                 if issue.rule_id == "min_duration":
                     min_duration_s = issue.details["min_duration_ms"] / 1000
-                    subtitle.end_time = subtitle.start_time + min_duration_s
+                    subtitle.end_time = _shift_time(subtitle.start_time, min_duration_s)
                     return True
             
             elif issue.validation_type == ValidationType.FORMAT:
                 if "double_space" in issue.issue_id:
-                    subtitle.text = re.sub(r'\s+', ' ', subtitle.text)
+                    subtitle.text = self._ws_re.sub(' ', subtitle.text)
                     return True
                 elif "trim_space" in issue.issue_id:
                     subtitle.text = subtitle.text.strip()
                     return True
             
             elif issue.validation_type == ValidationType.OVERLAP:
+                # 同一条字幕可能与多条重叠，取最早的截止时间
                 next_start = issue.details["next_start"]
-                subtitle.end_time = next_start - 0.001
+                subtitle.end_time = min(subtitle.end_time, _shift_time(next_start, -0.001))
                 return True
             
             elif issue.validation_type == ValidationType.READING_SPEED:
                 text_length = issue.details["text_length"]
                 max_cps = issue.details["max_cps"]
                 new_duration = text_length / max_cps
-                subtitle.end_time = subtitle.start_time + new_duration
+                subtitle.end_time = _shift_time(subtitle.start_time, new_duration)
                 return True
             
         except Exception as e:
@@ -613,19 +835,17 @@ class SubtitleDisplayValidator:
         
         return score
 
-    def _count_issues_by_type(self, issues: List[ValidationIssue]) -> Dict[ValidationType, int]:
-        """按类型统计问题"""
-        counts = defaultdict(int)
+    def _count_issues(self, issues: List[ValidationIssue]) -> Tuple[Dict[ValidationType, int],
+                                                                    Dict[ValidationSeverity, int]]:
+        """一次遍历同时按类型和严重程度统计问题"""
+        by_type: Dict[ValidationType, int] = {}
+        by_severity: Dict[ValidationSeverity, int] = {}
         for issue in issues:
-            counts[issue.validation_type] += 1
-        return dict(counts)
-
-    def _count_issues_by_severity(self, issues: List[ValidationIssue]) -> Dict[ValidationSeverity, int]:
-        """按严重程度统计问题"""
-        counts = defaultdict(int)
-        for issue in issues:
-            counts[issue.severity] += 1
-        return dict(counts)
+            validation_type = issue.validation_type
+            by_type[validation_type] = by_type.get(validation_type, 0) + 1
+            severity = issue.severity
+            by_severity[severity] = by_severity.get(severity, 0) + 1
+        return by_type, by_severity
 
     def _generate_recommendations(self, issues: List[ValidationIssue]) -> List[str]:
         """生成改进建议"""
@@ -635,16 +855,23 @@ class SubtitleDisplayValidator:
             recommendations.append("恭喜！所有字幕都符合显示标准。")
             return recommendations
         
-        critical_issues = [i for i in issues if i.severity == ValidationSeverity.CRITICAL]
-        high_issues = [i for i in issues if i.severity == ValidationSeverity.HIGH]
+        # 一次遍历统计严重、高优先级和可自动修复的问题数
+        critical_count = high_count = auto_fixable = 0
+        for issue in issues:
+            severity = issue.severity
+            if severity is ValidationSeverity.CRITICAL:
+                critical_count += 1
+            elif severity is ValidationSeverity.HIGH:
+                high_count += 1
+            if issue.can_auto_fix:
+                auto_fixable += 1
         
-        if critical_issues:
-            recommendations.append(f"发现 {len(critical_issues)} 个严重问题，必须立即修复")
+        if critical_count:
+            recommendations.append(f"发现 {critical_count} 个严重问题，必须立即修复")
         
-        if high_issues:
-            recommendations.append(f"发现 {len(high_issues)} 个高优先级问题，建议优先处理")
+        if high_count:
+            recommendations.append(f"发现 {high_count} 个高优先级问题，建议优先处理")
         
-        auto_fixable = len([i for i in issues if i.can_auto_fix])
         if auto_fixable > 0:
             recommendations.append(f"其中 {auto_fixable} 个问题可以自动修复")
         
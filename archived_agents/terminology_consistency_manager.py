@@ -5,18 +5,39 @@
 import json
 import uuid
 import re
+import logging
+import time
+import itertools
+from array import array
 from typing import Dict, List, Optional, Any, Tuple, Set
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from enum import Enum
 from collections import defaultdict
 import difflib
+import heapq
 
-from config import get_logger
+from config import get_logger, is_log_enabled
 from models.subtitle_models import SubtitleEntry
+from models.dataclass_options import SLOTS_DATACLASS_OPTIONS
+
+try:
+    # pyahocorasick：一次线性扫描匹配全部术语
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    # RapidFuzz 的 ratio（LCS 归一化相似度）不低于 difflib 的结果，用作快速预筛
+    from rapidfuzz import fuzz
+except ImportError:
+    fuzz = None
 
 logger = get_logger("terminology_consistency_manager")
 
+# 术语出现记录：(匹配文本, 所在字幕, 翻译语言)，源语言术语的翻译语言为None
+TermOccurrence = Tuple[str, SubtitleEntry, Optional[str]]
+
 
 class TermType(Enum):
     """术语类型"""
@@ -57,7 +78,48 @@ class ConflictResolutionStrategy(Enum):
     CONTEXT_DEPENDENT = "context_dependent"     # 根据上下文决定
 
 
-@dataclass
+# 术语类型 -> 冲突严重程度（未列出的类型为 LOW）
+TERM_TYPE_SEVERITY: Dict[TermType, ConflictSeverity] = {
+    TermType.PERSON_NAME: ConflictSeverity.CRITICAL,
+    TermType.PLACE_NAME: ConflictSeverity.CRITICAL,
+    TermType.TECHNICAL_TERM: ConflictSeverity.HIGH,
+    TermType.MILITARY_TERM: ConflictSeverity.HIGH,
+    TermType.TITLE: ConflictSeverity.MEDIUM,
+    TermType.ORGANIZATION: ConflictSeverity.MEDIUM,
+}
+
+# 冲突严重程度 -> 一致性分数惩罚
+SEVERITY_PENALTY: Dict[ConflictSeverity, float] = {
+    ConflictSeverity.CRITICAL: 0.2,
+    ConflictSeverity.HIGH: 0.1,
+    ConflictSeverity.MEDIUM: 0.05,
+    ConflictSeverity.LOW: 0.02,
+}
+
+# 按字符特征检测语言，按优先级依次匹配
+LANGUAGE_CHAR_PATTERNS: Tuple[Tuple[str, "re.Pattern"], ...] = (
+    ("zh", re.compile(r'[\u4e00-\u9fff]')),
+    ("ja", re.compile(r'[\u3040-\u309f\u30a0-\u30ff]')),
+    ("ko", re.compile(r'[\uac00-\ud7af]')),
+    ("en", re.compile(r'[a-zA-Z]')),  # 简化处理，实际需要更复杂的检测
+)
+
+# 分布统计按枚举序号计数，避免每次递增都做字符串键的字典查找
+TERM_TYPE_INDEX: Dict[TermType, int] = {term_type: i for i, term_type in enumerate(TermType)}
+SEVERITY_INDEX: Dict[ConflictSeverity, int] = {severity: i for i, severity in enumerate(ConflictSeverity)}
+
+
+def _new_distribution(members) -> array:
+    """创建按枚举序号索引的计数数组"""
+    return array('Q', bytes(8 * len(members)))
+
+
+def _distribution_dict(counts: array, members) -> Dict[str, int]:
+    """将计数数组还原为 {枚举值: 数量}（只保留非零项）"""
+    return {member.value: count for member, count in zip(members, counts) if count}
+
+
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class TermEntry:
     """术语条目"""
     term_id: str
@@ -72,6 +134,8 @@ class TermEntry:
     created_by: str = "system"          # 创建者
     approved: bool = False              # 是否已审核
     metadata: Optional[Dict[str, Any]] = None
+    # 各语言下每种译法在字幕中出现的次数 {language: {text: count}}
+    translation_counts: Dict[str, Dict[str, int]] = field(default_factory=dict)
     
     def __post_init__(self):
         if self.last_updated is None:
@@ -80,10 +144,10 @@ class TermEntry:
             self.metadata = {}
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class TermConflict:
     """术语冲突"""
-    conflict_id: str
+    conflict_id: int                    # 管理器内递增编号
     term_id: str
     source_text: str
     conflicting_translations: Dict[str, List[str]]  # {language: [conflicting_versions]}
@@ -100,7 +164,7 @@ class TermConflict:
             self.detected_at = datetime.now()
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ConsistencyCheckRequest:
     """一致性检查请求"""
     request_id: str
@@ -117,7 +181,7 @@ class ConsistencyCheckRequest:
             self.timestamp = datetime.now()
 
 
-@dataclass
+@dataclass(**SLOTS_DATACLASS_OPTIONS)
 class ConsistencyCheckResult:
     """一致性检查结果"""
     request_id: str
@@ -140,6 +204,65 @@ class ConsistencyCheckResult:
             self.timestamp = datetime.now()
 
 
+class _TermMatcher:
+    """多模式术语匹配器
+    
+    优先使用Aho-Corasick自动机，一次扫描找出文本中出现的全部术语；未安装pyahocorasick时，
+    退化为按长度降序合并的单个正则：前瞻匹配出每个位置上最长的术语，再用前缀表补全同一
+    位置上更短的术语。两种方式的结果都与逐个 `in` 判断一致
+    """
+    
+    def __init__(self, patterns: List[str]):
+        # 按模式的插入顺序返回匹配结果，与逐个扫描时的输出顺序保持一致（重复的模式按首次出现排序）
+        self.order: Dict[str, int] = {}
+        for pattern in patterns:
+            self.order.setdefault(pattern, len(self.order))
+        self.has_empty = "" in self.order  # 空串在任何文本中都算出现
+        words = [pattern for pattern in self.order if pattern]
+        # 术语首字符集合：文本不含其中任何字符时不可能匹配，可跳过扫描
+        self.first_chars = frozenset(word[0] for word in words)
+        
+        self.automaton = None
+        self.pattern = None
+        self.prefixes: Dict[str, Tuple[str, ...]] = {}
+        if not words:
+            return
+        
+        if ahocorasick is not None:
+            self.automaton = ahocorasick.Automaton()
+            for word in words:
+                self.automaton.add_word(word, word)
+            self.automaton.make_automaton()
+        else:
+            words.sort(key=len, reverse=True)
+            self.pattern = re.compile("(?=(" + "|".join(map(re.escape, words)) + "))")
+            self.prefixes = {
+                word: tuple(word[:end] for end in range(1, len(word) + 1) if word[:end] in self.order)
+                for word in words
+            }
+    
+    def may_match(self, text_chars: Set[str]) -> bool:
+        """根据文本的字符集合粗筛：返回False时文本中一定没有任何术语"""
+        return self.has_empty or not self.first_chars.isdisjoint(text_chars)
+    
+    def matches(self, text: str) -> List[str]:
+        """返回文本中出现的全部术语（去重，按插入顺序）"""
+        if self.automaton is not None:
+            found = {word for _, word in self.automaton.iter(text)}
+        elif self.pattern is not None:
+            found = set()
+            for longest in self.pattern.findall(text):
+                found.update(self.prefixes[longest])
+        else:
+            found = set()
+        
+        if self.has_empty:
+            found.add("")
+        if len(found) > 1:
+            return sorted(found, key=self.order.__getitem__)
+        return list(found)
+
+
 class TerminologyConsistencyManager:
     """术语一致性管理器
     
@@ -158,9 +281,15 @@ class TerminologyConsistencyManager:
         self.term_index: Dict[str, Set[str]] = defaultdict(set)  # source_text -> term_ids
         self.language_index: Dict[str, Dict[str, str]] = defaultdict(dict)  # lang -> {translation: term_id}
         
+        # 术语匹配器（由索引按需构建；索引变化时只丢弃受影响的匹配器，下次检查时重建）
+        self._source_matcher: Optional[_TermMatcher] = None
+        self._source_term_ids: Dict[str, Tuple[str, ...]] = {}  # 与源语言匹配器同时构建的 term_index 只读快照
+        self._language_matchers: Dict[str, _TermMatcher] = {}
+        
         # 冲突管理
-        self.active_conflicts: Dict[str, TermConflict] = {}
-        self.resolved_conflicts: Dict[str, TermConflict] = {}
+        self.active_conflicts: Dict[int, TermConflict] = {}
+        self.resolved_conflicts: Dict[int, TermConflict] = {}
+        self._conflict_ids = itertools.count(1)
         
         # 配置参数
         self.similarity_threshold = 0.8    # 相似度阈值
@@ -176,8 +305,8 @@ class TerminologyConsistencyManager:
             "conflicts_resolved": 0,
             "average_consistency_score": 0.0,
             "language_coverage": defaultdict(int),
-            "term_type_distribution": defaultdict(int),
-            "conflict_severity_distribution": defaultdict(int)
+            "term_type_distribution": _new_distribution(TermType),
+            "conflict_severity_distribution": _new_distribution(ConflictSeverity)
         }
         
         # 初始化核心术语
@@ -187,6 +316,7 @@ class TerminologyConsistencyManager:
     
     def _initialize_core_terms(self):
         """初始化核心术语"""
+        initialized_at = datetime.now()
         core_terms = [
             # 人名术语
             TermEntry(
@@ -203,7 +333,8 @@ class TerminologyConsistencyManager:
                 },
                 aliases=["小张", "张队长"],
                 context_examples=["张伟是我们的队长", "张伟同志"],
-                approved=True
+                approved=True,
+                last_updated=initialized_at
             ),
             
             # 军事术语
@@ -221,7 +352,8 @@ class TerminologyConsistencyManager:
                 },
                 aliases=["司令员", "指挥官"],
                 context_examples=["司令下达了命令", "海军司令"],
-                approved=True
+                approved=True,
+                last_updated=initialized_at
             ),
             
             # 技术术语
@@ -239,7 +371,8 @@ class TerminologyConsistencyManager:
                 },
                 aliases=["雷达系统"],
                 context_examples=["雷达显示有目标", "雷达探测"],
-                approved=True
+                approved=True,
+                last_updated=initialized_at
             ),
             
             # 称谓术语
@@ -257,7 +390,8 @@ class TerminologyConsistencyManager:
                 },
                 aliases=["队长同志", "小队长"],
                 context_examples=["队长，有情况", "我们的队长"],
-                approved=True
+                approved=True,
+                last_updated=initialized_at
             ),
             
             # 地名术语
@@ -275,7 +409,8 @@ class TerminologyConsistencyManager:
                 },
                 aliases=["首都", "京城"],
                 context_examples=["我来自北京", "北京的天气"],
-                approved=True
+                approved=True,
+                last_updated=initialized_at
             )
         ]
         
@@ -297,15 +432,17 @@ class TerminologyConsistencyManager:
             # 更新语言索引
             for language, translation in term.translations.items():
                 self.language_index[language][translation] = term.term_id
+            self._invalidate_matchers(term.translations, source=True)
             
             # 更新统计
             self.performance_stats["total_terms"] += 1
-            self.performance_stats["term_type_distribution"][term.term_type.value] += 1
+            self.performance_stats["term_type_distribution"][TERM_TYPE_INDEX[term.term_type]] += 1
             
             for language in term.translations.keys():
                 self.performance_stats["language_coverage"][language] += 1
             
-            logger.debug("术语已添加", term_id=term.term_id, source_text=term.source_text)
+            if is_log_enabled("terminology_consistency_manager", logging.DEBUG):
+                logger.debug("术语已添加", term_id=term.term_id, source_text=term.source_text)
             return True
             
         except Exception as e:
@@ -320,27 +457,37 @@ class TerminologyConsistencyManager:
                 return False
             
             term = self.term_database[term_id]
-            old_translations = term.translations.copy()
+            # 只在更新翻译时记录旧翻译（更新会替换整个字典，旧字典不受影响，无需复制）
+            old_translations = term.translations if "translations" in updates else None
             
             # 应用更新
-            for field, value in updates.items():
-                if hasattr(term, field):
-                    setattr(term, field, value)
+            for field_name, value in updates.items():
+                if hasattr(term, field_name):
+                    setattr(term, field_name, value)
             
             term.last_updated = datetime.now()
             
-            # 更新语言索引
-            if "translations" in updates:
+            # 更新语言索引：只处理译文发生变化的语言
+            if old_translations is not None:
+                changed_languages = set()
+                
                 # 移除旧的索引
                 for language, translation in old_translations.items():
-                    if translation in self.language_index[language]:
-                        del self.language_index[language][translation]
+                    if term.translations.get(language) != translation:
+                        if self.language_index[language].pop(translation, None) is not None:
+                            changed_languages.add(language)
                 
                 # 添加新的索引
                 for language, translation in term.translations.items():
-                    self.language_index[language][translation] = term_id
+                    index = self.language_index[language]
+                    if index.get(translation) != term_id:
+                        index[translation] = term_id
+                        changed_languages.add(language)
+                
+                self._invalidate_matchers(changed_languages)
             
-            logger.debug("术语已更新", term_id=term_id, updates=list(updates.keys()))
+            if is_log_enabled("terminology_consistency_manager", logging.DEBUG):
+                logger.debug("术语已更新", term_id=term_id, updates=list(updates.keys()))
             return True
             
         except Exception as e:
@@ -365,6 +512,7 @@ class TerminologyConsistencyManager:
             for language, translation in term.translations.items():
                 if translation in self.language_index[language]:
                     del self.language_index[language][translation]
+            self._invalidate_matchers(term.translations, source=True)
             
             # 从主数据库中移除
             del self.term_database[term_id]
@@ -372,7 +520,8 @@ class TerminologyConsistencyManager:
             # 更新统计
             self.performance_stats["total_terms"] -= 1
             
-            logger.debug("术语已删除", term_id=term_id)
+            if is_log_enabled("terminology_consistency_manager", logging.DEBUG):
+                logger.debug("术语已删除", term_id=term_id)
             return True
             
         except Exception as e:
@@ -384,6 +533,7 @@ class TerminologyConsistencyManager:
                   limit: int = 10) -> List[TermEntry]:
         """查找术语"""
         results = []
+        seen: Set[str] = set()  # 已加入结果的术语ID
         
         # 精确匹配
         if query in self.term_index:
@@ -391,62 +541,88 @@ class TerminologyConsistencyManager:
                 term = self.term_database[term_id]
                 if term_type is None or term.term_type == term_type:
                     results.append(term)
+                    seen.add(term.term_id)
         
         # 语言索引匹配
         if language in self.language_index and query in self.language_index[language]:
             term_id = self.language_index[language][query]
             term = self.term_database[term_id]
-            if term not in results and (term_type is None or term.term_type == term_type):
+            if term.term_id not in seen and (term_type is None or term.term_type == term_type):
                 results.append(term)
+                seen.add(term.term_id)
         
         # 模糊匹配
         if len(results) < limit:
             fuzzy_results = self._fuzzy_search(query, language, term_type, limit - len(results))
             for term in fuzzy_results:
-                if term not in results:
+                if term.term_id not in seen:
                     results.append(term)
+                    seen.add(term.term_id)
         
         return results[:limit]
     
     def _fuzzy_search(self, query: str, language: str, 
                      term_type: Optional[TermType], limit: int) -> List[TermEntry]:
-        """模糊搜索"""
-        candidates = []
+        """模糊搜索
         
-        for term in self.term_database.values():
+        用大小为limit的最小堆保留相似度最高的术语（相似度相同时先出现的优先）；
+        堆满后以堆顶相似度作为预筛阈值，达不到的候选直接跳过相似度计算
+        """
+        if limit <= 0:
+            return []
+        
+        threshold = self.similarity_threshold
+        top: List[Tuple[float, int, TermEntry]] = []  # (相似度, -出现顺序, 术语)，堆顶为当前最后一名
+        
+        for order, term in enumerate(self.term_database.values()):
             if term_type and term.term_type != term_type:
                 continue
             
-            # 计算相似度
-            similarity = 0.0
+            # 堆满后，只有超过当前最后一名的候选才可能进入结果
+            cutoff = top[0][0] if len(top) == limit else threshold
             
-            # 与源文本的相似度
-            source_similarity = difflib.SequenceMatcher(None, query, term.source_text).ratio()
-            similarity = max(similarity, source_similarity)
+            # 计算相似度（与源文本、翻译、别名的最大相似度）
+            similarity = self._text_similarity(query, term.source_text, cutoff)
             
-            # 与翻译的相似度
             if language in term.translations:
-                translation_similarity = difflib.SequenceMatcher(
-                    None, query, term.translations[language]
-                ).ratio()
-                similarity = max(similarity, translation_similarity)
+                similarity = max(similarity,
+                                 self._text_similarity(query, term.translations[language], cutoff))
             
-            # 与别名的相似度
             for alias in term.aliases:
-                alias_similarity = difflib.SequenceMatcher(None, query, alias).ratio()
-                similarity = max(similarity, alias_similarity)
+                similarity = max(similarity, self._text_similarity(query, alias, cutoff))
             
-            if similarity >= self.similarity_threshold:
-                candidates.append((similarity, term))
+            if similarity >= threshold:
+                candidate = (similarity, -order, term)
+                if len(top) < limit:
+                    heapq.heappush(top, candidate)
+                elif candidate[:2] > top[0][:2]:
+                    heapq.heapreplace(top, candidate)
         
-        # 按相似度排序
-        candidates.sort(key=lambda x: x[0], reverse=True)
-        
-        return [term for _, term in candidates[:limit]]
+        # 按相似度从高到低返回
+        return [term for _, _, term in sorted(top, key=lambda item: item[:2], reverse=True)]
+    
+    @staticmethod
+    def _text_similarity(query: str, text: str, threshold: float) -> float:
+        """计算 difflib 相似度；可以确定达不到阈值时跳过计算，直接返回0
+        
+        两个预筛条件都是 difflib ratio 的上界，因此不会改变达到阈值的结果：
+        长度上界 2*min(len)/(len之和)，以及 RapidFuzz 的 ratio（最长公共子序列
+        不短于 difflib 找到的匹配块总长）
+        """
+        total = len(query) + len(text)
+        if total and 2.0 * min(len(query), len(text)) / total < threshold:
+            return 0.0
+        
+        # 留出浮点误差余量，预筛只排除明确低于阈值的候选
+        if fuzz is not None and not fuzz.ratio(query, text, score_cutoff=threshold * 100 - 1e-6):
+            return 0.0
+        
+        return difflib.SequenceMatcher(None, query, text).ratio()
     
     def check_consistency(self, request: ConsistencyCheckRequest) -> ConsistencyCheckResult:
         """检查术语一致性"""
-        start_time = datetime.now()
+        start_ns = time.perf_counter_ns()
+        now = datetime.now()  # 本次检查内的冲突检测、自动解决共用同一时间戳
         
         try:
             # 提取文本中的术语
@@ -455,12 +631,12 @@ class TerminologyConsistencyManager:
             )
             
             # 检测冲突
-            conflicts = self._detect_conflicts(extracted_terms, request)
+            conflicts = self._detect_conflicts(extracted_terms, request, now)
             
             # 自动解决冲突（如果启用）
             auto_resolved_count = 0
             if request.auto_resolve:
-                auto_resolved_count = self._auto_resolve_conflicts(conflicts)
+                auto_resolved_count = self._auto_resolve_conflicts(conflicts, now)
             
             # 计算一致性分数
             consistency_score = self._calculate_consistency_score(extracted_terms, conflicts)
@@ -469,7 +645,7 @@ class TerminologyConsistencyManager:
             recommendations = self._generate_recommendations(conflicts, extracted_terms)
             
             # 计算处理时间
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            processing_time = (time.perf_counter_ns() - start_ns) / 1_000_000
             
             # 更新统计
             self._update_consistency_stats(extracted_terms, conflicts, consistency_score)
@@ -484,7 +660,8 @@ class TerminologyConsistencyManager:
                 auto_resolved_count=auto_resolved_count,
                 manual_review_required=len([c for c in conflicts if not c.resolved]),
                 processing_time_ms=int(processing_time),
-                recommendations=recommendations
+                recommendations=recommendations,
+                timestamp=now
             )
             
             logger.info("术语一致性检查完成",
@@ -496,7 +673,7 @@ class TerminologyConsistencyManager:
             return result
             
         except Exception as e:
-            processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            processing_time = (time.perf_counter_ns() - start_ns) / 1_000_000
             
             logger.error("术语一致性检查失败",
                         request_id=request.request_id,
@@ -510,37 +687,78 @@ class TerminologyConsistencyManager:
                 total_terms_checked=0,
                 conflicting_terms_count=0,
                 processing_time_ms=int(processing_time),
-                error_message=str(e)
+                error_message=str(e),
+                timestamp=now
             )
     
     def _extract_terms_from_subtitles(self, subtitle_entries: List[SubtitleEntry],
-                                    target_languages: List[str]) -> Dict[str, List[Tuple[str, str]]]:
-        """从字幕中提取术语"""
-        extracted_terms = defaultdict(list)  # {term_id: [(text, context)]}
+                                    target_languages: List[str]) -> Dict[str, List[TermOccurrence]]:
+        """从字幕中提取术语
+        
+        每条字幕只用自动机扫描一遍（源语言一遍、每种目标语言各一遍），
+        不再对术语库中的每个术语逐个做子串判断；上下文字符串推迟到确认冲突后再生成
+        """
+        extracted_terms = defaultdict(list)  # {term_id: [(text, entry, language)]}
+        
+        source_matcher = self._get_source_matcher()
+        source_term_ids = self._source_term_ids
+        language_matchers = [
+            (language, self._get_language_matcher(language), self.language_index[language])
+            for language in target_languages
+            if language in self.language_index
+        ]
         
         for entry in subtitle_entries:
             text = entry.text
+            text_chars = set(text)
             
             # 查找已知术语
-            for source_text, term_ids in self.term_index.items():
-                if source_text in text:
-                    for term_id in term_ids:
-                        context = f"字幕 {entry.index}: {text}"
-                        extracted_terms[term_id].append((source_text, context))
+            if source_matcher.may_match(text_chars):
+                matched_sources = source_matcher.matches(text)
+                for source_text in matched_sources:
+                    for term_id in source_term_ids[source_text]:
+                        extracted_terms[term_id].append((source_text, entry, None))
             
             # 查找翻译术语
-            for language in target_languages:
-                if language in self.language_index:
-                    for translation, term_id in self.language_index[language].items():
-                        if translation in text:
-                            context = f"字幕 {entry.index} ({language}): {text}"
-                            extracted_terms[term_id].append((translation, context))
+            for language, matcher, translations in language_matchers:
+                if not matcher.may_match(text_chars):
+                    continue
+                for translation in matcher.matches(text):
+                    extracted_terms[translations[translation]].append((translation, entry, language))
         
         return dict(extracted_terms)
     
-    def _detect_conflicts(self, extracted_terms: Dict[str, List[Tuple[str, str]]],
-                         request: ConsistencyCheckRequest) -> List[TermConflict]:
+    def _invalidate_matchers(self, languages, source: bool = False):
+        """索引变化后丢弃受影响语言（及源语言）的匹配器"""
+        if source:
+            self._source_matcher = None
+        for language in languages:
+            self._language_matchers.pop(language, None)
+    
+    def _get_source_matcher(self) -> _TermMatcher:
+        """获取源语言术语匹配器（按需构建）"""
+        if self._source_matcher is None:
+            self._source_term_ids = {
+                source_text: tuple(term_ids) for source_text, term_ids in self.term_index.items()
+            }
+            self._source_matcher = _TermMatcher(list(self._source_term_ids))
+        return self._source_matcher
+    
+    def _get_language_matcher(self, language: str) -> _TermMatcher:
+        """获取指定语言的翻译术语匹配器（按需构建）"""
+        matcher = self._language_matchers.get(language)
+        if matcher is None:
+            matcher = _TermMatcher(list(self.language_index[language]))
+            self._language_matchers[language] = matcher
+        return matcher
+    
+    def _detect_conflicts(self, extracted_terms: Dict[str, List[TermOccurrence]],
+                         request: ConsistencyCheckRequest,
+                         detected_at: Optional[datetime] = None) -> List[TermConflict]:
         """检测术语冲突"""
+        if detected_at is None:
+            detected_at = datetime.now()
+
         conflicts = []
         
         for term_id, occurrences in extracted_terms.items():
@@ -551,15 +769,19 @@ class TerminologyConsistencyManager:
             
             # 按语言分组检查
             language_variations = defaultdict(set)
-            contexts = []
+            translation_counts = term.translation_counts
+            text_languages: Dict[str, Optional[str]] = {}  # 同一术语的匹配文本大量重复，每种文本只检测一次
             
-            for text, context in occurrences:
-                contexts.append(context)
-                
+            for text, _, _ in occurrences:
                 # 确定这个文本属于哪种语言
-                detected_language = self._detect_text_language(text, term)
+                if text in text_languages:
+                    detected_language = text_languages[text]
+                else:
+                    detected_language = text_languages[text] = self._detect_text_language(text, term)
                 if detected_language:
                     language_variations[detected_language].add(text)
+                    counts = translation_counts.setdefault(detected_language, {})
+                    counts[text] = counts.get(text, 0) + 1
             
             # 检查每种语言的一致性
             conflicting_translations = {}
@@ -573,14 +795,17 @@ class TerminologyConsistencyManager:
                 severity = self._assess_conflict_severity(term, conflicting_translations)
                 
                 conflict = TermConflict(
-                    conflict_id=str(uuid.uuid4()),
+                    conflict_id=next(self._conflict_ids),
                     term_id=term_id,
                     source_text=term.source_text,
                     conflicting_translations=conflicting_translations,
                     severity=severity,
-                    contexts=contexts[:5],  # 限制上下文数量
+                    contexts=[  # 限制上下文数量
+                        self._format_context(entry, language) for _, entry, language in occurrences[:5]
+                    ],
                     suggested_resolution=self._suggest_resolution(term, conflicting_translations),
-                    resolution_strategy=self._determine_resolution_strategy(term, severity)
+                    resolution_strategy=self._determine_resolution_strategy(term, severity),
+                    detected_at=detected_at
                 )
                 
                 conflicts.append(conflict)
@@ -588,6 +813,13 @@ class TerminologyConsistencyManager:
         
         return conflicts
     
+    @staticmethod
+    def _format_context(entry: SubtitleEntry, language: Optional[str]) -> str:
+        """生成术语出现位置的上下文描述"""
+        if language is None:
+            return f"字幕 {entry.index}: {entry.text}"
+        return f"字幕 {entry.index} ({language}): {entry.text}"
+    
     def _detect_text_language(self, text: str, term: TermEntry) -> Optional[str]:
         """检测文本语言"""
         # 检查是否是源语言
@@ -600,29 +832,17 @@ class TerminologyConsistencyManager:
                 return language
         
         # 简单的语言检测（基于字符特征）
-        if re.search(r'[\u4e00-\u9fff]', text):
-            return "zh"
-        elif re.search(r'[\u3040-\u309f\u30a0-\u30ff]', text):
-            return "ja"
-        elif re.search(r'[\uac00-\ud7af]', text):
-            return "ko"
-        elif re.search(r'[a-zA-Z]', text):
-            return "en"  # 简化处理，实际需要更复杂的检测
-        
-        return None  
+        for language, pattern in LANGUAGE_CHAR_PATTERNS:
+            if pattern.search(text):
+                return language
+        
+        return None
   
     def _assess_conflict_severity(self, term: TermEntry, 
                                 conflicting_translations: Dict[str, List[str]]) -> ConflictSeverity:
         """评估冲突严重程度"""
         # 基于术语类型评估
-        if term.term_type in [TermType.PERSON_NAME, TermType.PLACE_NAME]:
-            return ConflictSeverity.CRITICAL
-        elif term.term_type in [TermType.TECHNICAL_TERM, TermType.MILITARY_TERM]:
-            return ConflictSeverity.HIGH
-        elif term.term_type in [TermType.TITLE, TermType.ORGANIZATION]:
-            return ConflictSeverity.MEDIUM
-        else:
-            return ConflictSeverity.LOW
+        return TERM_TYPE_SEVERITY.get(term.term_type, ConflictSeverity.LOW)
     
     def _suggest_resolution(self, term: TermEntry, 
                           conflicting_translations: Dict[str, List[str]]) -> str:
@@ -636,11 +856,19 @@ class TerminologyConsistencyManager:
                 suggestions.append(f"{language}: 建议统一使用 '{standard_translation}'")
             else:
                 # 推荐最常见的变体
-                most_common = max(variations, key=lambda x: term.usage_frequency)
+                most_common = self._most_frequent_variation(term, language, variations)
                 suggestions.append(f"{language}: 建议统一使用 '{most_common}'")
         
         return "; ".join(suggestions)
     
+    @staticmethod
+    def _most_frequent_variation(term: TermEntry, language: str, variations: List[str]) -> str:
+        """选出该语言下出现次数最多的变体（次数相同时取靠前的变体）"""
+        counts = term.translation_counts.get(language)
+        if not counts:
+            return variations[0]
+        return max(variations, key=lambda text: counts.get(text, 0))
+    
     def _determine_resolution_strategy(self, term: TermEntry, 
                                      severity: ConflictSeverity) -> ConflictResolutionStrategy:
         """确定解决策略"""
@@ -653,7 +881,8 @@ class TerminologyConsistencyManager:
         else:
             return ConflictResolutionStrategy.USE_LATEST
     
-    def _auto_resolve_conflicts(self, conflicts: List[TermConflict]) -> int:
+    def _auto_resolve_conflicts(self, conflicts: List[TermConflict],
+                                now: Optional[datetime] = None) -> int:
         """自动解决冲突"""
         resolved_count = 0
         
@@ -664,7 +893,7 @@ class TerminologyConsistencyManager:
                 ConflictResolutionStrategy.USE_AUTHORITATIVE
             ]:
                 # 尝试自动解决
-                if self._apply_resolution_strategy(conflict):
+                if self._apply_resolution_strategy(conflict, now):
                     conflict.resolved = True
                     conflict.resolution_notes = f"自动解决：{conflict.resolution_strategy.value}"
                     resolved_count += 1
@@ -676,7 +905,8 @@ class TerminologyConsistencyManager:
         
         return resolved_count
     
-    def _apply_resolution_strategy(self, conflict: TermConflict) -> bool:
+    def _apply_resolution_strategy(self, conflict: TermConflict,
+                                   now: Optional[datetime] = None) -> bool:
         """应用解决策略"""
         try:
             term = self.term_database.get(conflict.term_id)
@@ -694,15 +924,15 @@ class TerminologyConsistencyManager:
             elif conflict.resolution_strategy == ConflictResolutionStrategy.USE_MOST_FREQUENT:
                 # 使用最频繁的版本
                 for language, variations in conflict.conflicting_translations.items():
-                    # 简化实现：选择第一个变体作为最频繁的
-                    most_frequent = variations[0]
+                    most_frequent = self._most_frequent_variation(term, language, variations)
                     term.translations[language] = most_frequent
                     self.language_index[language][most_frequent] = term.term_id
+                    self._invalidate_matchers((language,))
                     return True
             
             elif conflict.resolution_strategy == ConflictResolutionStrategy.USE_LATEST:
                 # 使用最新的版本
-                term.last_updated = datetime.now()
+                term.last_updated = now or datetime.now()
                 return True
             
             return False
@@ -711,7 +941,7 @@ class TerminologyConsistencyManager:
             logger.error("应用解决策略失败", conflict_id=conflict.conflict_id, error=str(e))
             return False
     
-    def _calculate_consistency_score(self, extracted_terms: Dict[str, List[Tuple[str, str]]],
+    def _calculate_consistency_score(self, extracted_terms: Dict[str, List[TermOccurrence]],
                                    conflicts: List[TermConflict]) -> float:
         """计算一致性分数"""
         if not extracted_terms:
@@ -724,16 +954,7 @@ class TerminologyConsistencyManager:
         base_score = (total_terms - conflicting_terms) / total_terms
         
         # 根据冲突严重程度调整
-        severity_penalty = 0.0
-        for conflict in conflicts:
-            if conflict.severity == ConflictSeverity.CRITICAL:
-                severity_penalty += 0.2
-            elif conflict.severity == ConflictSeverity.HIGH:
-                severity_penalty += 0.1
-            elif conflict.severity == ConflictSeverity.MEDIUM:
-                severity_penalty += 0.05
-            else:
-                severity_penalty += 0.02
+        severity_penalty = sum(SEVERITY_PENALTY[conflict.severity] for conflict in conflicts)
         
         # 应用惩罚
         adjusted_score = base_score - (severity_penalty / total_terms)
@@ -741,7 +962,7 @@ class TerminologyConsistencyManager:
         return max(0.0, min(1.0, adjusted_score))
     
     def _generate_recommendations(self, conflicts: List[TermConflict],
-                                extracted_terms: Dict[str, List[Tuple[str, str]]]) -> List[str]:
+                                extracted_terms: Dict[str, List[TermOccurrence]]) -> List[str]:
         """生成建议"""
         recommendations = []
         
@@ -749,45 +970,67 @@ class TerminologyConsistencyManager:
             recommendations.append("术语使用一致性良好，无需特别处理")
             return recommendations
         
-        # 按严重程度分组
-        critical_conflicts = [c for c in conflicts if c.severity == ConflictSeverity.CRITICAL]
-        high_conflicts = [c for c in conflicts if c.severity == ConflictSeverity.HIGH]
+        # 一次遍历统计严重程度、人名冲突和可自动解决的冲突
+        critical_count = high_count = person_count = auto_resolvable_count = 0
+        for c in conflicts:
+            if c.severity is ConflictSeverity.CRITICAL:
+                critical_count += 1
+            elif c.severity is ConflictSeverity.HIGH:
+                high_count += 1
+            if self._term_type_of(c.term_id) is TermType.PERSON_NAME:
+                person_count += 1
+            if c.resolution_strategy is not ConflictResolutionStrategy.MANUAL_REVIEW:
+                auto_resolvable_count += 1
         
-        if critical_conflicts:
-            recommendations.append(f"发现 {len(critical_conflicts)} 个严重术语冲突，需要立即处理")
+        if critical_count:
+            recommendations.append(f"发现 {critical_count} 个严重术语冲突，需要立即处理")
         
-        if high_conflicts:
-            recommendations.append(f"发现 {len(high_conflicts)} 个高级术语冲突，建议优先处理")
+        if high_count:
+            recommendations.append(f"发现 {high_count} 个高级术语冲突，建议优先处理")
         
         # 术语类型建议
-        person_conflicts = [c for c in conflicts if self.term_database.get(c.term_id, {}).term_type == TermType.PERSON_NAME]
-        if person_conflicts:
+        if person_count:
             recommendations.append("人名翻译存在不一致，建议建立人名翻译标准")
         
         # 自动化建议
-        auto_resolvable = [c for c in conflicts if c.resolution_strategy != ConflictResolutionStrategy.MANUAL_REVIEW]
-        if auto_resolvable:
-            recommendations.append(f"{len(auto_resolvable)} 个冲突可以自动解决，建议启用自动解决功能")
+        if auto_resolvable_count:
+            recommendations.append(f"{auto_resolvable_count} 个冲突可以自动解决，建议启用自动解决功能")
         
         return recommendations
     
-    def _update_consistency_stats(self, extracted_terms: Dict[str, List[Tuple[str, str]]],
+    def _term_type_of(self, term_id: str) -> Optional[TermType]:
+        """获取术语类型（术语已删除时返回None）"""
+        term = self.term_database.get(term_id)
+        return term.term_type if term is not None else None
+    
+    def _update_consistency_stats(self, extracted_terms: Dict[str, List[TermOccurrence]],
                                 conflicts: List[TermConflict], consistency_score: float):
         """更新一致性统计"""
         self.performance_stats["total_checks"] += 1
         self.performance_stats["conflicts_detected"] += len(conflicts)
         
-        # 更新平均一致性分数
-        total_checks = self.performance_stats["total_checks"]
+        # 更新平均一致性分数（增量形式，避免先乘后除累积误差）
         current_avg = self.performance_stats["average_consistency_score"]
-        new_avg = (current_avg * (total_checks - 1) + consistency_score) / total_checks
-        self.performance_stats["average_consistency_score"] = new_avg
+        self.performance_stats["average_consistency_score"] = (
+            current_avg + (consistency_score - current_avg) / self.performance_stats["total_checks"]
+        )
         
         # 更新冲突严重程度分布
+        severity_counts = self.performance_stats["conflict_severity_distribution"]
         for conflict in conflicts:
-            self.performance_stats["conflict_severity_distribution"][conflict.severity.value] += 1
+            severity_counts[SEVERITY_INDEX[conflict.severity]] += 1
     
-    def resolve_conflict(self, conflict_id: str, resolution: str, 
+    @property
+    def term_type_distribution(self) -> Dict[str, int]:
+        """术语类型分布 {类型值: 数量}"""
+        return _distribution_dict(self.performance_stats["term_type_distribution"], TermType)
+    
+    @property
+    def conflict_severity_distribution(self) -> Dict[str, int]:
+        """冲突严重程度分布 {严重程度值: 数量}"""
+        return _distribution_dict(self.performance_stats["conflict_severity_distribution"], ConflictSeverity)
+    
+    def resolve_conflict(self, conflict_id: int, resolution: str, 
                         strategy: ConflictResolutionStrategy) -> bool:
         """手动解决冲突"""
         try:
@@ -836,6 +1079,7 @@ class TerminologyConsistencyManager:
                 # 更新语言索引
                 for language, translation in updates["translations"].items():
                     self.language_index[language][translation] = term.term_id
+                self._invalidate_matchers(updates["translations"])
         except json.JSONDecodeError:
             # 如果不是JSON，作为注释处理
             if not term.metadata:
@@ -847,7 +1091,7 @@ class TerminologyConsistencyManager:
         return {
             "total_terms": len(self.term_database),
             "approved_terms": len([t for t in self.term_database.values() if t.approved]),
-            "term_types": dict(self.performance_stats["term_type_distribution"]),
+            "term_types": self.term_type_distribution,
             "language_coverage": dict(self.performance_stats["language_coverage"]),
             "active_conflicts": len(self.active_conflicts),
             "resolved_conflicts": len(self.resolved_conflicts),
@@ -900,7 +1144,8 @@ class TerminologyConsistencyManager:
                     last_updated=datetime.fromisoformat(term_data["last_updated"]),
                     created_by=term_data.get("created_by", "import"),
                     approved=term_data.get("approved", False),
-                    metadata=term_data.get("metadata", {})
+                    metadata=term_data.get("metadata", {}),
+                    translation_counts=term_data.get("translation_counts", {})
                 )
                 
                 if term_id in self.term_database:
@@ -930,7 +1175,11 @@ class TerminologyConsistencyManager:
             "term_database_size": len(self.term_database),
             "active_conflicts": len(self.active_conflicts),
             "resolved_conflicts": len(self.resolved_conflicts),
-            "performance_stats": dict(self.performance_stats),
+            "performance_stats": {
+                **self.performance_stats,
+                "term_type_distribution": self.term_type_distribution,
+                "conflict_severity_distribution": self.conflict_severity_distribution
+            },
             "configuration": {
                 "similarity_threshold": self.similarity_threshold,
                 "frequency_weight": self.frequency_weight,
@@ -948,19 +1197,19 @@ class TerminologyConsistencyManager:
             "conflicts_resolved": 0,
             "average_consistency_score": 0.0,
             "language_coverage": defaultdict(int),
-            "term_type_distribution": defaultdict(int),
-            "conflict_severity_distribution": defaultdict(int)
+            "term_type_distribution": _new_distribution(TermType),
+            "conflict_severity_distribution": _new_distribution(ConflictSeverity)
         }
         
         # 重新计算语言覆盖和术语类型分布
         for term in self.term_database.values():
-            self.performance_stats["term_type_distribution"][term.term_type.value] += 1
+            self.performance_stats["term_type_distribution"][TERM_TYPE_INDEX[term.term_type]] += 1
             for language in term.translations.keys():
                 self.performance_stats["language_coverage"][language] += 1
         
         logger.info("统计信息已重置")
     
-    def resolve_conflict(self, conflict_id: str, resolution: str, 
+    def resolve_conflict(self, conflict_id: int, resolution: str, 
                         resolved_by: str = "system") -> bool:
         """手动解决冲突"""
         try:
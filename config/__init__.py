@@ -10,7 +10,7 @@ from .config import (
     is_production,
     is_local,
 )
-from .logging_config import setup_logging, get_logger
+from .logging_config import setup_logging, get_logger, is_log_enabled
 
 __all__ = [
     "bedrock_config",
@@ -22,4 +22,5 @@ __all__ = [
     "is_local",
     "setup_logging",
     "get_logger",
+    "is_log_enabled",
 ]
\ No newline at end of file
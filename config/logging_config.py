@@ -7,9 +7,13 @@ import structlog
 from pathlib import Path
 from .config import system_config
 
+# setup_logging() 之后 structlog 通过标准库 logging 输出，级别由标准库 logger 决定
+_stdlib_logging_configured = False
+
 
 def setup_logging():
     """设置日志配置"""
+    global _stdlib_logging_configured
     
     # 创建日志目录
     log_dir = Path(system_config.log_file).parent
@@ -44,6 +48,7 @@ def setup_logging():
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
+    _stdlib_logging_configured = True
 
 
 def get_logger(name: str):
@@ -51,6 +56,17 @@ def get_logger(name: str):
     return structlog.get_logger(name)
 
 
+def is_log_enabled(name: str, level: int) -> bool:
+    """判断名为 name 的 logger 是否会输出 level 级别的日志
+    
+    structlog 默认配置的 logger 没有 isEnabledFor，且不按级别过滤，因此
+    setup_logging() 之前一律返回 True；之后按同名标准库 logger 的级别判断
+    """
+    if not _stdlib_logging_configured:
+        return True
+    return logging.getLogger(name).isEnabledFor(level)
+
+
 # 预定义的logger
 system_logger = get_logger("system")
 agent_logger = get_logger("agent")
@@ -0,0 +1,8 @@
+"""
+dataclass 公共选项
+"""
+import sys
+from typing import Any, Dict
+
+# Python 3.10+ 的 dataclass 支持 slots，去掉实例 __dict__；更早版本退化为普通 dataclass
+SLOTS_DATACLASS_OPTIONS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
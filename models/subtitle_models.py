@@ -2,6 +2,7 @@
 字幕相关数据模型
 """
 import re
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
@@ -36,9 +37,9 @@ class SpeechPace(Enum):
     VERY_FAST = "very_fast"
 
 
-@dataclass
+@dataclass(frozen=True)
 class TimeCode:
-    """时间码类"""
+    """时间码类（不可变，总毫秒数在创建时计算一次）"""
     hours: int
     minutes: int
     seconds: int
@@ -54,6 +55,14 @@ class TimeCode:
             raise ValueError(f"秒必须在0-59之间，得到: {self.seconds}")
         if not (0 <= self.milliseconds <= 999):
             raise ValueError(f"毫秒必须在0-999之间，得到: {self.milliseconds}")
+        
+        # 预先计算总毫秒数，比较和时长计算直接使用（字段不可修改，不会过期）
+        object.__setattr__(self, "_ms", (
+            self.hours * 3600000 +
+            self.minutes * 60000 +
+            self.seconds * 1000 +
+            self.milliseconds
+        ))
     
     @classmethod
     def from_string(cls, time_str: str) -> 'TimeCode':
@@ -71,6 +80,19 @@ class TimeCode:
         hours, minutes, seconds, milliseconds = map(int, match.groups())
         return cls(hours, minutes, seconds, milliseconds)
     
+    @classmethod
+    def from_srt_str(cls, time_str: str) -> 'TimeCode':
+        """按固定位置切片解析SRT时间码（HH:MM:SS,mmm）
+        
+        调用方需保证格式已校验（如已通过正则匹配），此处不再做正则解析。
+        """
+        return cls(
+            int(time_str[0:2]),
+            int(time_str[3:5]),
+            int(time_str[6:8]),
+            int(time_str[9:12])
+        )
+    
     def to_string(self, format_type: str = "srt") -> str:
         """转换为字符串格式"""
         if format_type.lower() == "srt":
@@ -82,12 +104,7 @@ class TimeCode:
     
     def to_milliseconds(self) -> int:
         """转换为总毫秒数"""
-        return (
-            self.hours * 3600000 +
-            self.minutes * 60000 +
-            self.seconds * 1000 +
-            self.milliseconds
-        )
+        return self._ms
     
     @classmethod
     def from_milliseconds(cls, ms: int) -> 'TimeCode':
@@ -105,19 +122,19 @@ class TimeCode:
         return self.to_string()
     
     def __lt__(self, other: 'TimeCode') -> bool:
-        return self.to_milliseconds() < other.to_milliseconds()
+        return self._ms < other._ms
     
     def __le__(self, other: 'TimeCode') -> bool:
-        return self.to_milliseconds() <= other.to_milliseconds()
+        return self._ms <= other._ms
     
     def __gt__(self, other: 'TimeCode') -> bool:
-        return self.to_milliseconds() > other.to_milliseconds()
+        return self._ms > other._ms
     
     def __ge__(self, other: 'TimeCode') -> bool:
-        return self.to_milliseconds() >= other.to_milliseconds()
+        return self._ms >= other._ms
     
     def __eq__(self, other: 'TimeCode') -> bool:
-        return self.to_milliseconds() == other.to_milliseconds()
+        return self._ms == other._ms
 
 
 @dataclass
@@ -265,6 +282,9 @@ class SubtitleFile:
     total_duration: float = field(init=False)
     average_reading_speed: float = field(init=False)
     
+    # 后台上下文分析任务（仅在解析时选择后台分析才会设置）
+    analysis_future: Optional[Future] = field(default=None, repr=False, compare=False)
+    
     def __post_init__(self):
         """初始化后处理"""
         self.total_entries = len(self.entries)
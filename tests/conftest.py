@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+测试公共配置
+"""
+import sys
+
+import archived_agents
+
+# 归档的 Agent 模块仍按旧包名 agents 相互导入
+sys.modules.setdefault("agents", archived_agents)
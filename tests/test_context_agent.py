@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+上下文管理 Agent 测试
+"""
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from archived_agents.context_agent import ContextAgent, ContextQuery, _DiskResultCache, to_plain_dict
+from archived_agents.dialogue_context_tracker import DialogueEntry, PronounReference, PronounType
+from models.story_models import (
+    CharacterRelation, FormalityLevel, RelationshipConfig, RelationshipType, RespectLevel, StoryContext
+)
+from models.subtitle_models import SubtitleEntry
+
+PROJECT_ID = "test_project"
+
+
+@pytest.fixture
+def agent(tmp_path, monkeypatch):
+    agent = ContextAgent("test_context_agent")
+    agent._disk_cache = _DiskResultCache(str(tmp_path / "query_results.sqlite3"))
+    agent.kb_calls = []
+
+    def query_knowledge(kb_query):
+        agent.kb_calls.append(kb_query)
+        return SimpleNamespace(success=True, results=[kb_query.source_text], confidence=0.9,
+                               metadata={}, cache_hit=False)
+
+    monkeypatch.setattr(agent.dynamic_kb, "query_knowledge", query_knowledge)
+    monkeypatch.setattr(
+        agent.context_manager, "get_cultural_adaptation_context",
+        lambda project_id, target_language: {"genre": "军事", "cultural_notes": [],
+                                             "target_language": target_language}
+    )
+    yield agent
+    agent.close()
+
+
+def _story_context(*names: str) -> StoryContext:
+    story_context = StoryContext(title="测试", genre="军事", setting="军营", time_period="现代")
+    for name in names:
+        story_context.add_character(CharacterRelation(name=name, role="主角", profession="军人", gender="male"))
+    return story_context
+
+
+def _relationship(address_style: str) -> RelationshipConfig:
+    return RelationshipConfig(
+        relationship_type=RelationshipType.FAMILY_PARENT,
+        formality_level=FormalityLevel.MEDIUM,
+        respect_level=RespectLevel.HIGH,
+        address_style=address_style,
+    )
+
+
+def _cultural_query(index: int, text: str, speaker=None, history=None) -> ContextQuery:
+    return ContextQuery(
+        query_id=f"q{index}",
+        project_id=PROJECT_ID,
+        query_type="cultural_adaptation",
+        subtitle_entry=SubtitleEntry(index=index, start_time=0.0, end_time=1.0, text=text, speaker=speaker),
+        dialogue_history=history,
+        target_language="en",
+    )
+
+
+def test_cultural_cache_key_ignores_index_speaker_and_history(agent):
+    first = agent.process_query(_cultural_query(1, "报告长官", speaker="张三"))
+    history = [SubtitleEntry(index=1, start_time=0.0, end_time=1.0, text="报告长官")]
+    second = agent.process_query(_cultural_query(2, "报告长官", speaker="李四", history=history))
+
+    assert first.success and second.success
+    assert second.result == first.result
+    assert len(agent.kb_calls) == 1
+    assert agent.performance_metrics["cache_hits"] == 1
+
+
+def test_cached_result_is_copied_on_store(agent):
+    first = agent.process_query(_cultural_query(1, "报告长官"))
+    first.result["cultural_mappings"].append("modified")
+
+    second = agent.process_query(_cultural_query(2, "报告长官"))
+
+    assert second.result["cultural_mappings"] == ["报告长官"]
+
+
+def test_clear_project_cache_drops_cached_query_results(agent):
+    agent.process_query(_cultural_query(1, "报告长官"))
+    assert len(agent._query_cache) == 1
+
+    agent.context_manager.clear_project_cache(PROJECT_ID)
+
+    assert len(agent._query_cache) == 0
+
+
+def test_clear_project_cache_rebuilds_character_index(agent):
+    first = agent._get_character_index(PROJECT_ID, _story_context("张三"))
+    assert list(first) == ["张三"]
+    assert agent._get_character_index(PROJECT_ID, _story_context("李四")) is first
+
+    agent.context_manager.clear_project_cache(PROJECT_ID)
+
+    assert list(agent._get_character_index(PROJECT_ID, _story_context("李四"))) == ["李四"]
+
+
+def test_clear_project_cache_drops_cached_relationships(agent):
+    story_context = _story_context("张三", "李四")
+    story_context.main_characters["张三"].relationships["李四"] = _relationship("family")
+    assert agent._get_relationship(PROJECT_ID, story_context, "张三", "李四").address_style == "family"
+
+    reloaded = _story_context("张三", "李四")
+    reloaded.main_characters["张三"].relationships["李四"] = _relationship("formal_title")
+    assert agent._get_relationship(PROJECT_ID, reloaded, "张三", "李四").address_style == "family"
+
+    agent.context_manager.clear_project_cache(PROJECT_ID)
+
+    assert agent._get_relationship(PROJECT_ID, reloaded, "张三", "李四").address_style == "formal_title"
+
+
+def test_disk_cache_key_follows_adaptation_context(agent, monkeypatch):
+    adaptation_context = {"genre": "军事", "cultural_notes": []}
+    monkeypatch.setattr(
+        agent.context_manager, "get_cultural_adaptation_context",
+        lambda project_id, target_language: dict(adaptation_context)
+    )
+    agent.process_query(_cultural_query(1, "报告长官"))
+
+    agent.clear_query_cache()
+    agent.process_query(_cultural_query(1, "报告长官"))
+    assert len(agent.kb_calls) == 1
+
+    agent.clear_query_cache()
+    adaptation_context["genre"] = "家庭"
+    response = agent.process_query(_cultural_query(1, "报告长官"))
+    assert len(agent.kb_calls) == 2
+    assert response.result["adaptation_context"]["genre"] == "家庭"
+
+
+def test_to_plain_dict_copies_containers_and_is_json_serializable():
+    entry = DialogueEntry(
+        subtitle_entry=SubtitleEntry(index=1, start_time=0.0, end_time=1.0, text="他来了"),
+        speaker="张三",
+        timestamp=datetime(2024, 1, 1),
+        pronouns=[PronounReference(pronoun="他", pronoun_type=PronounType.PERSONAL, position=0,
+                                   candidates=["李四"])],
+        mentioned_entities={"李四"},
+    )
+
+    plain = to_plain_dict(entry)
+    plain["pronouns"].append("modified")
+    plain["pronouns"][0]["candidates"].append("modified")
+    plain["mentioned_entities"].append("modified")
+
+    assert len(entry.pronouns) == 1
+    assert entry.pronouns[0].candidates == ["李四"]
+    assert entry.mentioned_entities == {"李四"}
+    assert json.loads(json.dumps(to_plain_dict(entry)))["pronouns"][0]["pronoun_type"] == PronounType.PERSONAL.value
+
+
+def test_relationship_analysis_returns_json_safe_copy(agent, monkeypatch):
+    story_context = _story_context("张三", "李四")
+    relationship = _relationship("family")
+    relationship.language_specific["en"] = {"address": "Dad"}
+    story_context.main_characters["张三"].relationships["李四"] = relationship
+    monkeypatch.setattr(
+        agent.context_manager, "get_speaker_context",
+        lambda project_id, entry, history: {"speaker": "张三", "addressee": "李四", "relationship": {}}
+    )
+    query = ContextQuery(
+        query_id="q1",
+        project_id=PROJECT_ID,
+        query_type="relationship_analysis",
+        subtitle_entry=SubtitleEntry(index=1, start_time=0.0, end_time=1.0, text="爸"),
+    )
+
+    response = agent.process_query(query, story_context=story_context)
+
+    detailed = json.loads(json.dumps(response.result))["detailed_relationship"]
+    assert detailed["relationship_type"] == RelationshipType.FAMILY_PARENT.value
+    response.result["detailed_relationship"]["language_specific"]["en"]["address"] = "modified"
+    assert relationship.language_specific["en"] == {"address": "Dad"}
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+文件解析Agent测试
+"""
+import random
+
+import pytest
+
+from archived_agents.file_parser import SRTParser
+
+SAMPLE_SRT = """1
+00:00:01,000 --> 00:00:03,000
+张三：报告长官！
+
+2
+00:00:03,500 --> 00:00:05,000
+立正。
+"""
+
+
+@pytest.fixture
+def parser():
+    parser = SRTParser()
+    yield parser
+    parser.close()
+
+
+@pytest.fixture
+def srt_path(tmp_path):
+    path = tmp_path / "sample.srt"
+    path.write_text(SAMPLE_SRT, encoding="utf-8")
+    return path
+
+
+def test_analysis_executor_is_created_only_for_background_analysis(parser, srt_path, monkeypatch):
+    analyzed = []
+    monkeypatch.setattr(parser, "_analyze_context", lambda subtitle_file, project_id: analyzed.append(project_id))
+
+    result = parser.parse_file(str(srt_path), project_id="test_project")
+    assert result.success
+    assert analyzed == ["test_project"]
+    assert result.data.analysis_future is None
+    assert parser._analysis_executor is None
+
+    result = parser.parse_file(str(srt_path), project_id="test_project", background_analysis=True)
+    result.data.analysis_future.result(timeout=5)
+    assert analyzed == ["test_project", "test_project"]
+    assert parser._analysis_executor is not None
+
+    parser.close()
+    assert parser._analysis_executor is None
+
+
+def _entry_fields(entry):
+    if entry is None:
+        return None
+    return (entry.index, entry.start_time, entry.end_time, entry.text, entry.speaker,
+            entry.original_text, entry.reading_speed)
+
+
+def _parse_block(parser, block):
+    entries, errors, warnings, _ = parser._parse_srt_content(block)
+    return _entry_fields(entries[0]) if entries else None, bool(errors)
+
+
+def _parse_block_line_by_line(parser, block):
+    try:
+        return _entry_fields(parser._parse_subtitle_block(block.strip(), 1)), False
+    except ValueError:
+        return None, True
+
+
+def test_fused_block_regex_matches_line_by_line_parser(parser):
+    blocks = [
+        "1\n00:00:01,000 --> 00:00:03,000\n张三：报告长官！",
+        "2 \n 00:00:03,500-->00:00:05,000 X1:100 X2:200\r\n<i>立正。</i>\r\n{\\an8}稍息",
+        "3\n00:00:05,000 --> 00:00:06,000\n\n  ",
+        "4\n00:00:05,000 --> 00:00:06,000",
+        "x5\n00:00:05,000 --> 00:00:06,000\n文本",
+        "6\n00:00:05,000 -> 00:00:06,000\n文本",
+        "7\n\u300000:00:05,000 --> 00:00:06,000\u3000\n李四:\u3000走吧  走吧",
+    ]
+    rng = random.Random(0)
+    spaces = ["", " ", "\t", "\r", "\u3000"]
+    texts = ["报告长官！", "王五：是！\n马上出发", "<b>注意</b>  安全", "Hello,   world"]
+    for number in range(100):
+        blocks.append(
+            f"{number}{rng.choice(spaces)}\n{rng.choice(spaces)}00:00:{number % 60:02d},000"
+            f"{rng.choice(spaces)}-->{rng.choice(spaces)}00:01:{number % 60:02d},500{rng.choice(spaces)}\n"
+            f"{rng.choice(spaces)}{rng.choice(texts)}{rng.choice(spaces)}"
+        )
+
+    for block in blocks:
+        assert _parse_block(parser, block) == _parse_block_line_by_line(parser, block), block
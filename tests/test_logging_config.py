@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+日志配置测试
+"""
+import logging
+
+from config import logging_config
+from config.logging_config import get_logger, is_log_enabled
+
+
+def test_is_log_enabled_under_default_structlog_config():
+    # 未调用 setup_logging() 时 structlog 不按级别过滤
+    assert not logging_config._stdlib_logging_configured
+    assert is_log_enabled("test_logging_config", logging.DEBUG)
+    get_logger("test_logging_config").debug("调试日志", value=1)
+
+
+def test_is_log_enabled_follows_stdlib_level_after_setup(monkeypatch):
+    monkeypatch.setattr(logging_config, "_stdlib_logging_configured", True)
+    stdlib_logger = logging.getLogger("test_logging_config")
+    stdlib_logger.setLevel(logging.WARNING)
+    try:
+        assert not is_log_enabled("test_logging_config", logging.INFO)
+        assert is_log_enabled("test_logging_config", logging.ERROR)
+    finally:
+        stdlib_logger.setLevel(logging.NOTSET)
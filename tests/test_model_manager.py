@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+模型容错管理器测试
+"""
+import pytest
+
+pytest.importorskip("strands.models")
+
+from archived_agents import model_manager
+from archived_agents.model_manager import ModelFallbackManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(model_manager, "_build_model", lambda **config: config["model_id"])
+    manager = ModelFallbackManager()
+    probes = []
+
+    def probe(model):
+        probes.append(model)
+        return True
+
+    monkeypatch.setattr(manager, "_test_model_availability", probe)
+    manager.probes = probes
+    return manager
+
+
+def test_verified_model_is_not_probed_again(manager):
+    primary_id = manager.primary_config["model_id"]
+
+    assert manager.get_model_with_fallback() == primary_id
+    manager.mark_success("primary")
+    assert manager.get_model_with_fallback() == primary_id
+    assert manager.probes == [primary_id]
+
+
+def test_mark_failure_on_primary_counts_failure_and_backs_off(manager):
+    manager.mark_success("primary")
+
+    manager.mark_failure("primary", RuntimeError("ThrottlingException"))
+
+    assert manager.primary_failure_count == 1
+    assert manager.last_failure_time is not None
+    assert "primary" not in manager._verified
+    # 退避期间改用备用模型
+    manager.current_model_type = "fallback"
+    assert manager.get_model_with_fallback() == manager.fallback_config["model_id"]
+
+
+def test_mark_failure_on_fallback_only_drops_verification(manager):
+    manager.mark_success("primary")
+    manager.mark_success("fallback")
+
+    manager.mark_failure("fallback", RuntimeError("timeout"))
+
+    assert manager.primary_failure_count == 0
+    assert manager._verified == {"primary"}
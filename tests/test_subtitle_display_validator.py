@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+字幕显示验证器测试
+"""
+import asyncio
+
+from archived_agents import subtitle_display_validator
+from archived_agents.subtitle_display_validator import (
+    SubtitleDisplayValidator,
+    ValidationRequest,
+    ValidationSeverity,
+    ValidationType,
+)
+from models.subtitle_models import SubtitleEntry, TimeCode
+
+
+def _entry(index: int, start_ms: int, end_ms: int, text: str) -> SubtitleEntry:
+    """按毫秒构造使用 TimeCode 时间的字幕条目"""
+    return SubtitleEntry(
+        index=index,
+        start_time=TimeCode.from_milliseconds(start_ms),
+        end_time=TimeCode.from_milliseconds(end_ms),
+        text=text,
+    )
+
+
+def _validate(subtitles, **kwargs):
+    validator = SubtitleDisplayValidator("test_validator")
+    request = ValidationRequest(request_id="test", subtitle_entries=subtitles, **kwargs)
+    return asyncio.run(validator.validate_subtitles(request))
+
+
+def test_overlap_and_gap_with_timecode_entries():
+    subtitles = [
+        _entry(1, 0, 2000, "Hello there."),
+        _entry(2, 1500, 3500, "How are you?"),
+        _entry(3, 3600, 5600, "Fine, thanks."),
+    ]
+
+    result = _validate(subtitles)
+
+    assert result.success
+    overlaps = [issue for issue in result.issues_found if issue.validation_type == ValidationType.OVERLAP]
+    gaps = [issue for issue in result.issues_found if issue.validation_type == ValidationType.GAP]
+    assert [(issue.subtitle_index, issue.details["next_index"]) for issue in overlaps] == [(0, 1)]
+    assert overlaps[0].details["overlap_ms"] == 500
+    assert [(issue.subtitle_index, issue.details["next_index"]) for issue in gaps] == [(1, 2)]
+    assert gaps[0].details["gap_ms"] == 100
+
+
+def test_auto_fix_updates_fixed_subtitles_without_mutating_input():
+    subtitles = [
+        _entry(1, 0, 500, "Hi."),
+        _entry(2, 2000, 4500, "Nice to meet you."),
+        _entry(3, 4000, 6000, "Likewise."),
+    ]
+
+    result = _validate(subtitles, auto_fix=True)
+
+    fixed = result.fixed_subtitles
+    assert {issue.rule_id for issue in result.fixed_issues} >= {"min_duration", "overlap_detection"}
+    assert fixed[0].end_time == TimeCode.from_milliseconds(1000)
+    assert fixed[1].end_time == TimeCode.from_milliseconds(3999)
+    assert fixed[2] is subtitles[2]
+    assert subtitles[0].end_time == TimeCode.from_milliseconds(500)
+    assert subtitles[1].end_time == TimeCode.from_milliseconds(4500)
+
+
+def test_built_in_rules_are_not_shared_between_validators():
+    first = SubtitleDisplayValidator("first")
+    second = SubtitleDisplayValidator("second")
+
+    rule = first.get_rule_by_id("min_gap")
+    rule.enabled = False
+    rule.parameters["min_gap_ms"] = 1000
+
+    other = second.get_rule_by_id("min_gap")
+    assert other.enabled
+    assert other.parameters["min_gap_ms"] == 250
+
+
+def test_validation_plan_follows_rule_changes():
+    validator = SubtitleDisplayValidator("test_validator")
+    subtitles = [
+        _entry(1, 0, 2000, "Hello there."),
+        _entry(2, 1500, 3500, "How are you?"),
+    ]
+
+    def overlap_severities():
+        request = ValidationRequest(request_id="test", subtitle_entries=subtitles)
+        result = asyncio.run(validator.validate_subtitles(request))
+        return [issue.severity for issue in result.issues_found if issue.rule_id == "overlap_detection"]
+
+    assert overlap_severities() == [ValidationSeverity.CRITICAL]
+    validator.get_rule_by_id("overlap_detection").severity = ValidationSeverity.LOW
+    assert overlap_severities() == [ValidationSeverity.LOW]
+    validator.get_rule_by_id("overlap_detection").severity = ValidationSeverity.CRITICAL
+    assert overlap_severities() == [ValidationSeverity.CRITICAL]
+    assert len(validator._plan_cache) == 2
+
+
+def test_large_batch_offloaded_validation_matches_inline(monkeypatch):
+    subtitles = [_entry(i + 1, i * 1000, i * 1000 + (300 if i % 7 == 0 else 1200), f"Line {i}") for i in range(50)]
+
+    def issue_summary(result):
+        return [(issue.rule_id, issue.subtitle_index, issue.message) for issue in result.issues_found]
+
+    inline = _validate(subtitles)
+    monkeypatch.setattr(subtitle_display_validator, "OFFLOAD_VALIDATION_MIN_SUBTITLES", 10)
+    offloaded = _validate(subtitles)
+
+    assert offloaded.success
+    assert issue_summary(offloaded) == issue_summary(inline)
+    assert issue_summary(inline)
+
+
+def test_fix_threshold_limits_auto_fix_by_severity():
+    subtitles = [
+        _entry(1, 0, 500, "Hi."),
+        _entry(2, 2000, 4500, "Nice to meet you."),
+        _entry(3, 4000, 6000, "Likewise."),
+    ]
+
+    critical_only = _validate(subtitles, auto_fix=True, fix_threshold=ValidationSeverity.CRITICAL)
+    with_high = _validate(subtitles, auto_fix=True, fix_threshold=ValidationSeverity.HIGH)
+
+    assert {issue.rule_id for issue in critical_only.fixed_issues} == {"overlap_detection"}
+    assert {issue.rule_id for issue in with_high.fixed_issues} >= {"overlap_detection", "min_duration"}
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+字幕数据模型测试
+"""
+import dataclasses
+import pickle
+
+import pytest
+
+from models.subtitle_models import TimeCode
+
+
+def test_timecode_is_immutable_so_cached_milliseconds_stay_valid():
+    time_code = TimeCode(0, 1, 2, 345)
+
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        time_code.seconds = 3
+
+    assert time_code.to_milliseconds() == 62345
+    shifted = dataclasses.replace(time_code, seconds=3)
+    assert shifted.to_milliseconds() == 63345
+    assert time_code < shifted
+
+
+def test_timecode_round_trips_through_pickle():
+    time_code = TimeCode.from_srt_str("01:02:03,456")
+
+    restored = pickle.loads(pickle.dumps(time_code))
+
+    assert restored == time_code
+    assert restored.to_milliseconds() == time_code.to_milliseconds()
+    assert hash(restored) == hash(time_code)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+术语一致性管理器测试
+"""
+import random
+
+import pytest
+
+from archived_agents import terminology_consistency_manager
+from archived_agents.terminology_consistency_manager import _TermMatcher
+
+ALPHABET = "ab张三长官"
+
+
+def _naive_matches(patterns, text):
+    """逐个术语 `in` 判断的参考实现（去重，按插入顺序）"""
+    return [pattern for pattern in dict.fromkeys(patterns) if pattern in text]
+
+
+def _random_cases(seed: int, count: int):
+    rng = random.Random(seed)
+    for _ in range(count):
+        patterns = [
+            "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 4)))
+            for _ in range(rng.randint(0, 8))
+        ]
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 20)))
+        yield patterns, text
+
+
+FIXED_CASES = [
+    (["张三", "张", "三长", "长官"], "张三长官来了"),
+    (["a", "aa", "aaa"], "aaaa"),
+    (["ab", "b", "abab"], "xabab"),
+    (["长官", "长官", "官"], "报告长官"),
+    (["", "x"], "abc"),
+    ([], "abc"),
+    (["李四"], ""),
+]
+
+
+@pytest.fixture(params=["automaton", "regex"])
+def matcher_mode(request, monkeypatch):
+    if request.param == "automaton":
+        if terminology_consistency_manager.ahocorasick is None:
+            pytest.skip("未安装 pyahocorasick")
+    else:
+        monkeypatch.setattr(terminology_consistency_manager, "ahocorasick", None)
+    return request.param
+
+
+def test_matcher_agrees_with_per_term_scan(matcher_mode):
+    cases = FIXED_CASES + list(_random_cases(seed=7, count=500))
+    for patterns, text in cases:
+        matcher = _TermMatcher(patterns)
+        expected = _naive_matches(patterns, text)
+        assert matcher.matches(text) == expected, (patterns, text)
+        if expected:
+            assert matcher.may_match(set(text)), (patterns, text)
+
+
+def test_matcher_uses_expected_backend(matcher_mode):
+    matcher = _TermMatcher(["张三", "长官"])
+
+    if matcher_mode == "automaton":
+        assert matcher.automaton is not None and matcher.pattern is None
+    else:
+        assert matcher.automaton is None and matcher.pattern is not None